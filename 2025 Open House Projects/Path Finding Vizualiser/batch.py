@@ -0,0 +1,281 @@
+import argparse
+import json
+import time
+from array import array
+from collections import deque
+
+import numpy as np
+
+import solver
+from grid import WALL, random_grid
+from maze import GENERATORS, Maze, distance_field, generate_maze
+
+ACTIVE_LANDMARKS = 3  # landmarks each search uses, the best ones for its endpoints
+
+# Answer many start/goal distance queries on one maze or grid. Structure
+# that does not depend on the query is built once:
+#   - a perfect maze is a tree, so TreeIndex roots it and answers queries
+#     with a lowest-common-ancestor lookup (vectorized over whole batches)
+#   - any other graph gets a LandmarkIndex: BFS distances from a few
+#     landmark cells give a tighter A* heuristic than Manhattan (ALT).
+#     Queries are still one A* each, so batches are no faster than single
+#     queries, but each search expands several times fewer cells (2-4x
+#     faster than plain A* on open grids of 60x60 to 200x200)
+# Run from this folder, e.g.
+#   python batch.py --size 500 --queries 20000
+
+
+def bfs_tree(graph, root):
+    # BFS parent and depth of every cell (-1 where root cannot reach)
+    n = len(graph)
+    parent = array("i", [-1]) * n
+    depth = array("i", [-1]) * n
+    parent[root] = root
+    depth[root] = 0
+    queue = deque([root])
+    neighbors = graph.neighbors
+    while queue:
+        current = queue.popleft()
+        d = depth[current] + 1
+        for neighbor in neighbors(current):
+            if depth[neighbor] < 0:
+                depth[neighbor] = d
+                parent[neighbor] = current
+                queue.append(neighbor)
+    return np.frombuffer(parent, dtype=np.int32), np.frombuffer(depth, dtype=np.int32)
+
+
+def is_perfect(graph):
+    # Connected with exactly n - 1 passages, i.e. a spanning tree
+    n = len(graph)
+    passages = sum(len(graph.neighbors(i)) for i in range(n)) // 2
+    if passages != n - 1:
+        return False
+    return bool((bfs_tree(graph, 0)[1] >= 0).all())
+
+
+class TreeIndex:
+    # Distance between any two cells of a tree: depth[a] + depth[b] -
+    # 2 * depth[lca(a, b)], with the LCA found by binary lifting
+    def __init__(self, graph, root=0):
+        self.graph = graph
+        self.parent, self.depth = bfs_tree(graph, root)
+        if (self.depth < 0).any():
+            raise ValueError("TreeIndex needs a connected maze")
+        # up[k][i] is the 2**k-th ancestor of i (the root is its own parent)
+        levels = max(1, int(self.depth.max()).bit_length())
+        self.up = [self.parent]
+        for _ in range(1, levels):
+            self.up.append(self.up[-1][self.up[-1]])
+
+    def lca(self, a, b):
+        a = np.array(a, dtype=np.int64, copy=True)
+        b = np.array(b, dtype=np.int64, copy=True)
+        depth = self.depth
+
+        # Make a the deeper cell, then lift it to b's depth
+        swap = depth[a] < depth[b]
+        a[swap], b[swap] = b[swap], a[swap]
+        diff = depth[a] - depth[b]
+        for k, up in enumerate(self.up):
+            lift = (diff >> k) & 1 == 1
+            a[lift] = up[a[lift]]
+
+        # Lift both to just below their common ancestor
+        same = a == b
+        for up in reversed(self.up):
+            ua, ub = up[a], up[b]
+            differ = ua != ub
+            a[differ] = ua[differ]
+            b[differ] = ub[differ]
+        return np.where(same, a, self.parent[a])
+
+    def distances(self, starts, ends):
+        starts = np.asarray(starts)
+        ends = np.asarray(ends)
+        depth = self.depth
+        return depth[starts] + depth[ends] - 2 * depth[self.lca(starts, ends)]
+
+    def lca_one(self, a, b):
+        # Scalar version of lca(); avoids array overhead for single queries
+        depth = self.depth
+        if depth[a] < depth[b]:
+            a, b = b, a
+        diff = int(depth[a] - depth[b])
+        k = 0
+        while diff:
+            if diff & 1:
+                a = self.up[k][a]
+            diff >>= 1
+            k += 1
+        if a == b:
+            return int(a)
+        for up in reversed(self.up):
+            if up[a] != up[b]:
+                a, b = up[a], up[b]
+        return int(self.parent[a])
+
+    def distance(self, start, end):
+        depth = self.depth
+        return int(depth[start] + depth[end] - 2 * depth[self.lca_one(start, end)])
+
+
+class LandmarkIndex:
+    # ALT: for any landmark L, |d(L, goal) - d(L, cell)| never overestimates
+    # d(cell, goal), so the max over a few landmarks is an admissible and
+    # consistent A* heuristic
+    def __init__(self, graph, count=8, seed=0):
+        self.graph = graph
+        self.tables = []
+        # Farthest-point selection: each new landmark is the cell farthest
+        # from the ones already chosen
+        rng = np.random.default_rng(seed)
+        open_cells = np.flatnonzero(getattr(graph, "state", np.zeros(len(graph))) != WALL)
+        landmark = int(rng.choice(open_cells))
+        nearest = None
+        for _ in range(count):
+            dist = distance_field(graph, landmark)
+            self.tables.append(dist.tolist())
+            reach = np.where(dist < 0, np.iinfo(np.int32).max, dist)
+            nearest = reach if nearest is None else np.minimum(nearest, reach)
+            candidates = np.where(nearest == np.iinfo(np.int32).max, -1, nearest)
+            if candidates.max() <= 0:
+                break
+            landmark = int(candidates.argmax())
+
+    def landmarks(self, start, end):
+        # The landmarks with the tightest bound on d(start, end) tend to
+        # stay tight along the way; checking all of them at every cell
+        # costs more than the extra cells they would save
+        tables = sorted(self.tables, key=lambda table: -abs(table[end] - table[start]))
+        return [(table, table[end]) for table in tables[:ACTIVE_LANDMARKS]]
+
+    def reachable(self, start, end):
+        for table in self.tables:
+            if (table[start] < 0) != (table[end] < 0):
+                return False
+        return True
+
+    def search(self, start, end):
+        return solver.a_star(self.graph, start, end, landmarks=self.landmarks(start, end))
+
+    def distance(self, start, end):
+        if not self.reachable(start, end):
+            return -1
+        result = self.search(start, end)
+        return len(result.path) - 1 if result.found else -1
+
+    def distances(self, starts, ends):
+        return np.array([self.distance(int(a), int(b)) for a, b in zip(starts, ends)], dtype=np.int64)
+
+
+class BatchSolver:
+    def __init__(self, graph, landmarks=8):
+        self.graph = graph
+        if isinstance(graph, Maze) and is_perfect(graph):
+            self.kind = "tree"
+            self.index = TreeIndex(graph)
+        else:
+            self.kind = "alt"
+            self.index = LandmarkIndex(graph, landmarks)
+
+    def distances(self, starts, ends):
+        return self.index.distances(starts, ends)
+
+    def distance(self, start, end):
+        return self.index.distance(start, end)
+
+
+def percentiles(latencies):
+    # Latency summary in microseconds
+    us = np.asarray(latencies) * 1e6
+    return {
+        "p50_us": round(float(np.percentile(us, 50)), 2),
+        "p90_us": round(float(np.percentile(us, 90)), 2),
+        "p99_us": round(float(np.percentile(us, 99)), 2),
+        "max_us": round(float(us.max()), 2),
+    }
+
+
+def timed(query, starts, ends):
+    latencies = []
+    answers = []
+    for a, b in zip(starts.tolist(), ends.tolist()):
+        begin = time.perf_counter()
+        answers.append(query(a, b))
+        latencies.append(time.perf_counter() - begin)
+    return answers, latencies
+
+
+def a_star_distance(graph, start, end):
+    result = solver.a_star(graph, start, end)
+    return len(result.path) - 1 if result.found else -1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Answer many start/goal queries on one maze")
+    parser.add_argument("--size", type=int, default=200)
+    parser.add_argument("--type", choices=["maze", "open"], default="maze")
+    parser.add_argument("--generator", choices=list(GENERATORS), default="backtracker")
+    parser.add_argument("--density", type=float, default=0.25, help="wall density of open grids")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--queries", type=int, default=10000)
+    parser.add_argument("--landmarks", type=int, default=8)
+    parser.add_argument("--baseline", type=int, default=200,
+                        help="queries to also answer with plain A* for comparison")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    if args.type == "maze":
+        graph = generate_maze(Maze(args.size), args.seed, args.generator)
+        cells = np.arange(len(graph))
+    else:
+        graph = random_grid(args.size, density=args.density, seed=args.seed)
+        cells = np.flatnonzero(graph.state != WALL)
+    rng = np.random.default_rng(args.seed)
+    starts = rng.choice(cells, args.queries)
+    ends = rng.choice(cells, args.queries)
+
+    begin = time.perf_counter()
+    batch = BatchSolver(graph, args.landmarks)
+    build = time.perf_counter() - begin
+
+    begin = time.perf_counter()
+    answers = batch.distances(starts, ends)
+    batch_time = time.perf_counter() - begin
+
+    single, latencies = timed(batch.distance, starts, ends)
+    if list(answers) != single:
+        raise SystemExit("batch and single query answers differ")
+
+    sample = min(args.baseline, args.queries)
+    expected, baseline = timed(lambda a, b: a_star_distance(graph, a, b), starts[:sample], ends[:sample])
+    if list(answers[:sample]) != expected:
+        raise SystemExit("index answers differ from A*")
+
+    report = {
+        "grid": f"{args.type} {graph.rows}x{graph.cols}",
+        "index": batch.kind,
+        "queries": args.queries,
+        "build_s": round(build, 4),
+        "batch_s": round(batch_time, 4),
+        "batch_queries_per_s": round(args.queries / batch_time, 1),
+        "query_latency": percentiles(latencies),
+        "a_star_latency": percentiles(baseline),
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{report['grid']}, {batch.kind} index built in {build:.3f} s")
+    print(f"{args.queries} queries in {batch_time:.3f} s "
+          f"({report['batch_queries_per_s']:.0f} queries/s as one batch)")
+    for name in ("query_latency", "a_star_latency"):
+        stats = report[name]
+        label = "single query" if name == "query_latency" else f"A* ({sample} queries)"
+        print(f"{label:>20}: p50 {stats['p50_us']:.1f} us, p90 {stats['p90_us']:.1f} us, "
+              f"p99 {stats['p99_us']:.1f} us, max {stats['max_us']:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import mazefile
+import solver
+from grid import random_grid
+from maze import GENERATORS, Maze, generate_maze
+
+# Compare every search algorithm on seeded mazes and open random-wall grids
+# of increasing size. Run from this folder, e.g.
+#   python benchmark.py --sizes 20 50 100 --seeds 3 --format csv
+# Nothing here imports pygame.
+
+FIELDS = ["grid_type", "size", "seed", "algorithm", "found", "path_length",
+          "nodes_expanded", "time_ms", "peak_kb"]
+
+
+def make_graph(grid_type, size, seed, density, generator, cache=None):
+    # With a cache folder each grid is generated once, saved, and memory
+    # mapped from disk on later runs
+    if cache:
+        detail = generator if grid_type == "maze" else f"d{density}"
+        path = os.path.join(cache, f"{grid_type}-{detail}-{size}-{seed}.maze")
+        if os.path.exists(path):
+            kind = mazefile.KIND_WALLS if grid_type == "maze" else mazefile.KIND_CELLS
+            return mazefile.load(path, mode="r", kind=kind)[0]
+
+    if grid_type == "maze":
+        graph = generate_maze(Maze(size), seed, generator)
+    else:
+        graph = random_grid(size, density=density, seed=seed)
+
+    if cache:
+        os.makedirs(cache, exist_ok=True)
+        mazefile.save(path, graph, seed)
+    return graph
+
+
+def measure(name, graph, start, end, options):
+    # Time an untraced run (tracemalloc slows Python down a lot), then run
+    # again under tracemalloc for the peak memory of one search. The timed
+    # run reuses score arrays allocated beforehand, as repeated searches
+    # would; the traced run allocates its own, so every algorithm is
+    # charged for the per-cell arrays it uses (IDA* has none).
+    solver.get_workspace(len(graph), 0)
+    solver.get_workspace(len(graph), 1)
+
+    begin = time.perf_counter()
+    result = solver.solve(name, graph, start, end, **options)
+    elapsed = time.perf_counter() - begin
+    del result
+
+    solver.free_workspaces()
+    tracemalloc.start()
+    result = solver.solve(name, graph, start, end, **options)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def run(sizes, seeds, grid_types, algorithms, density, ida_limit, generator, cache=None):
+    rows = []
+    for size in sizes:
+        for grid_type in grid_types:
+            for seed in range(seeds):
+                graph = make_graph(grid_type, size, seed, density, generator, cache)
+                start, end = 0, len(graph) - 1
+                for name in algorithms:
+                    if not solver.supports(name, graph):
+                        continue
+                    options = {"max_expansions": ida_limit} if name == "idastar" else {}
+                    result, elapsed, peak = measure(name, graph, start, end, options)
+                    rows.append({
+                        "grid_type": grid_type,
+                        "size": size,
+                        "seed": seed,
+                        "algorithm": name,
+                        "found": result.found if not result.aborted else "aborted",
+                        "path_length": max(len(result.path) - 1, 0),
+                        "nodes_expanded": result.nodes_expanded,
+                        "time_ms": round(elapsed * 1000, 3),
+                        "peak_kb": round(peak / 1024, 1),
+                    })
+                    print(f"{grid_type:5} {size:5} seed={seed} {name:14} "
+                          f"{rows[-1]['time_ms']:10.3f} ms", file=sys.stderr)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the search algorithms")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20, 50, 100, 200])
+    parser.add_argument("--seeds", type=int, default=3, help="grids per size and type")
+    parser.add_argument("--types", nargs="+", choices=["maze", "open"], default=["maze", "open"])
+    parser.add_argument("--algorithms", nargs="+", choices=list(solver.ALGORITHMS),
+                        default=list(solver.ALGORITHMS))
+    parser.add_argument("--density", type=float, default=0.25, help="wall density of open grids")
+    parser.add_argument("--generator", choices=list(GENERATORS), default="backtracker",
+                        help="maze generation algorithm")
+    parser.add_argument("--cache", metavar="DIR", help="save generated grids here and reuse them")
+    parser.add_argument("--ida-limit", type=int, default=200_000,
+                        help="expansions before IDA* gives up")
+    parser.add_argument("--format", choices=["csv", "json"], default="csv")
+    parser.add_argument("--output", help="file to write (default: stdout)")
+    args = parser.parse_args(argv)
+
+    rows = run(args.sizes, args.seeds, args.types, args.algorithms, args.density,
+               args.ida_limit, args.generator, args.cache)
+
+    out = open(args.output, "w", newline="") if args.output else sys.stdout
+    try:
+        if args.format == "json":
+            json.dump(rows, out, indent=2)
+            out.write("\n")
+        else:
+            writer = csv.DictWriter(out, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
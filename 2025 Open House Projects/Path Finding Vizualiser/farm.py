@@ -0,0 +1,105 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+import sharedpool
+import solver
+from maze import ALL_WALLS, GENERATORS, Maze, generate_maze
+
+# Headless maze "farm": generate N seeded mazes and solve them on a pool of
+# worker processes. All mazes live in one shared-memory block of wall bytes
+# (one row of rows * cols bytes per maze), so workers write and read walls
+# in place and only seeds and small stat dicts are pickled. Run from this
+# folder, e.g.
+#   python farm.py --mazes 64 --size 200
+
+def _maze(slot):
+    # Maze `slot` of the pool's (count, rows, cols) wall array
+    mazes = sharedpool.shared()
+    _, rows, cols = mazes.shape
+    return Maze.from_buffer(mazes[slot].reshape(rows * cols), rows, cols)
+
+
+def generate_task(slot, seed, generator):
+    maze = _maze(slot)
+    maze.walls[:] = ALL_WALLS
+    generate_maze(maze, seed, generator)
+    return slot
+
+
+def solve_task(slot, algorithm):
+    maze = _maze(slot)
+    result = solver.solve(algorithm, maze, 0, len(maze) - 1)
+    return {
+        "slot": slot,
+        "path_length": len(result.path) - 1,
+        "nodes_expanded": result.nodes_expanded,
+        "elapsed": result.elapsed,
+    }
+
+
+def run(workers, count, rows, cols, seed, generator, algorithm):
+    # Generate and solve `count` mazes on `workers` processes
+    with sharedpool.SharedPool(workers, (count, rows, cols), np.uint8) as pool:
+        begin = time.perf_counter()
+        slots = list(range(count))
+        list(pool.map(generate_task, slots, [seed + s for s in slots], [generator] * count))
+        generated = time.perf_counter()
+        stats = list(pool.map(solve_task, slots, [algorithm] * count))
+        solved = time.perf_counter()
+
+    return {
+        "workers": workers,
+        "generate_s": round(generated - begin, 4),
+        "solve_s": round(solved - generated, 4),
+        "total_s": round(solved - begin, 4),
+        "mazes_per_s": round(count / (solved - begin), 2),
+        "mean_path_length": round(sum(s["path_length"] for s in stats) / count, 1),
+    }
+
+
+def worker_counts(limit):
+    # 1, 2, 4, ... up to and including limit
+    counts = []
+    n = 1
+    while n < limit:
+        counts.append(n)
+        n *= 2
+    counts.append(limit)
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate and solve mazes on all CPU cores")
+    parser.add_argument("--mazes", type=int, default=64)
+    parser.add_argument("--size", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first maze")
+    parser.add_argument("--generator", choices=list(GENERATORS), default="backtracker")
+    parser.add_argument("--algorithm", default="astar",
+                        choices=[name for name in solver.ALGORITHMS if name not in solver.CELL_GRID_ONLY])
+    parser.add_argument("--workers", type=int, nargs="+",
+                        help="worker counts to try (default: 1, 2, 4, ... all cores)")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    counts = args.workers or worker_counts(os.cpu_count() or 1)
+    results = []
+    for workers in counts:
+        results.append(run(workers, args.mazes, args.size, args.size, args.seed,
+                           args.generator, args.algorithm))
+        results[-1]["speedup"] = round(results[0]["total_s"] / results[-1]["total_s"], 2)
+        if not args.json:
+            r = results[-1]
+            print(f"{workers:3} workers: {r['mazes_per_s']:8.2f} mazes/s "
+                  f"(generate {r['generate_s']:.3f} s, solve {r['solve_s']:.3f} s, "
+                  f"speedup x{r['speedup']:.2f})")
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import numpy as np
+
+# Cell states (one byte per cell in Grid.state)
+EMPTY = 0
+WALL = 1
+START = 2
+END = 3
+OPEN = 4
+CLOSED = 5
+PATH = 6
+JUMP = 7  # expanded jump point (Jump Point Search)
+
+# States written by a search run (cleared before the next one)
+SEARCH_STATES = (OPEN, CLOSED, PATH, JUMP)
+
+
+class Grid:
+    def __init__(self, rows, cols=None):
+        self.rows = rows
+        self.cols = rows if cols is None else cols
+        # A bytearray for fast per-cell access from Python loops, with a
+        # NumPy view over the same memory for whole-grid operations
+        self.cells = bytearray(self.rows * self.cols)
+        self.state = np.frombuffer(self.cells, dtype=np.uint8)
+
+    @classmethod
+    def from_buffer(cls, data, rows, cols):
+        # Wrap an existing uint8 array (e.g. a numpy.memmap) without copying
+        grid = cls.__new__(cls)
+        grid.rows = rows
+        grid.cols = cols
+        grid.state = data
+        grid.cells = memoryview(data)
+        return grid
+
+    def __len__(self):
+        return len(self.cells)
+
+    def index(self, row, col):
+        return row * self.cols + col
+
+    def pos(self, i):
+        return divmod(i, self.cols)
+
+    def in_bounds(self, row, col):
+        return 0 <= row < self.rows and 0 <= col < self.cols
+
+    def is_wall(self, i):
+        return self.cells[i] == WALL
+
+    def set(self, i, state):
+        self.cells[i] = state
+
+    def get(self, i):
+        return self.cells[i]
+
+    def neighbors(self, i):
+        cells = self.cells
+        cols = self.cols
+        row, col = divmod(i, cols)
+        neighbors = []
+
+        if row < self.rows - 1 and cells[i + cols] != WALL:  # DOWN
+            neighbors.append(i + cols)
+        if row > 0 and cells[i - cols] != WALL:  # UP
+            neighbors.append(i - cols)
+        if col < cols - 1 and cells[i + 1] != WALL:  # RIGHT
+            neighbors.append(i + 1)
+        if col > 0 and cells[i - 1] != WALL:  # LEFT
+            neighbors.append(i - 1)
+
+        return neighbors
+
+    def clear_search(self):
+        # Drop open/closed/path marks but keep walls, start and end
+        self.state[np.isin(self.state, SEARCH_STATES)] = EMPTY
+
+    def clear(self):
+        self.state.fill(EMPTY)
+
+
+def random_grid(rows, cols=None, density=0.3, seed=None):
+    # Open grid with a random fraction of wall cells; the top-left and
+    # bottom-right corners are always left open for start and end
+    grid = Grid(rows, cols)
+    rng = np.random.default_rng(seed)
+    grid.state[rng.random(len(grid)) < density] = WALL
+    grid.set(0, EMPTY)
+    grid.set(len(grid) - 1, EMPTY)
+    return grid
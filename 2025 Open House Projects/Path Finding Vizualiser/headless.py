@@ -0,0 +1,296 @@
+import argparse
+import json
+import os
+import random
+import runpy
+import sys
+import time
+
+import numpy as np
+import pygame
+
+import profiler
+import solver
+
+# Run any of the pygame apps without a display and time them. The app runs
+# through its own command line (everything after "--" is passed on), with
+# SDL's dummy video driver, no frame-rate cap, and pygame's event queue and
+# mouse replaced by a script of events. Run from this folder, e.g.
+#   python headless.py maze_ai --ticks 2000 -- --size 300 --speed 50
+#   python headless.py visualizer --script clicks.json --json -- --size 100 --walls 0.3
+#
+# A script is a JSON list of [tick, event type, attributes] entries, one
+# tick being one pygame.event.get() call (one pass of an app's loop), e.g.
+#   [[1, "MOUSEBUTTONDOWN", {"button": 1, "at": [0.5, 0.5]}],
+#    [2, "MOUSEBUTTONUP", {"button": 1, "at": [0.5, 0.5]}],
+#    [3, "KEYDOWN", {"key": "space"}]]
+# "key" takes pygame key names, "pos" is in pixels and "at" is a fraction of
+# the window size. Once the tick budget is used up the app is sent QUIT.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CAR_DIR = os.path.join(HERE, "..", "Self Driving Virtual Car")
+
+APPS = {
+    "visualizer": os.path.join(HERE, "pathfinding_vizualizer.py"),
+    "maze_ai": os.path.join(HERE, "maze_ai.py"),
+    "maze_game": os.path.join(HERE, "maze_game.py"),
+    "car": os.path.join(CAR_DIR, "main.py"),
+}
+
+# Used when no --script is given: enough input to make each app do its work
+DEFAULT_SCRIPTS = {
+    # Start in the top left corner, end in the bottom right, then search
+    "visualizer": [
+        [1, "MOUSEBUTTONDOWN", {"button": 1, "at": [0, 0]}],
+        [2, "MOUSEBUTTONUP", {"button": 1, "at": [0, 0]}],
+        [3, "MOUSEBUTTONDOWN", {"button": 1, "at": [0.999, 0.999]}],
+        [4, "MOUSEBUTTONUP", {"button": 1, "at": [0.999, 0.999]}],
+        [5, "KEYDOWN", {"key": "space"}],
+    ],
+    # The search starts on its own; zoom out while it is replayed
+    "maze_ai": [[tick, "MOUSEWHEEL", {"x": 0, "y": -1}] for tick in (50, 100, 150)],
+    # Walk right and down
+    "maze_game": [[tick, "KEYDOWN", {"key": "right" if tick % 2 else "down"}] for tick in range(1, 400)],
+    "car": [],
+}
+
+
+class ScriptedInput:
+    # Stands in for pygame.event.get and the mouse state functions
+    def __init__(self, script, ticks):
+        self.script = sorted(script, key=lambda entry: entry[0])
+        self.ticks = ticks
+        self.tick = 0
+        self.next = 0
+        self.buttons = [False] * 5
+        self.pos = (0, 0)
+        self.delivered = 0
+
+    def _event(self, kind, attrs):
+        attrs = dict(attrs)
+        if isinstance(attrs.get("key"), str):
+            attrs["key"] = pygame.key.key_code(attrs["key"])
+        if "at" in attrs:
+            width, height = pygame.display.get_surface().get_size()
+            fx, fy = attrs.pop("at")
+            attrs["pos"] = (min(int(fx * width), width - 1), min(int(fy * height), height - 1))
+        if "pos" in attrs:
+            attrs["pos"] = tuple(attrs["pos"])
+            self.pos = attrs["pos"]
+        if "buttons" in attrs:
+            attrs["buttons"] = tuple(attrs["buttons"])
+            self.buttons[:3] = attrs["buttons"]
+        if kind == "MOUSEBUTTONDOWN":
+            self.buttons[attrs["button"] - 1] = True
+        elif kind == "MOUSEBUTTONUP":
+            self.buttons[attrs["button"] - 1] = False
+        return pygame.event.Event(getattr(pygame, kind), attrs)
+
+    def get(self, *args, **kwargs):
+        if pygame.display.get_init():
+            pygame.event.pump()
+        if self.tick >= self.ticks:
+            return [pygame.event.Event(pygame.QUIT)]
+        self.tick += 1
+        events = []
+        while self.next < len(self.script) and self.script[self.next][0] <= self.tick:
+            _, kind, attrs = self.script[self.next]
+            events.append(self._event(kind, attrs))
+            self.next += 1
+        self.delivered += len(events)
+        return events
+
+    def get_pressed(self, num_buttons=3):
+        return tuple(self.buttons[:num_buttons])
+
+    def get_pos(self):
+        return self.pos
+
+
+class FastClock:
+    # pygame.time.Clock without the frame-rate cap. A capped tick reports
+    # the frame time asked for rather than the (shorter) real one, so apps
+    # that step their simulation by frame time (the car) run the same
+    # steps on every run.
+    def __init__(self):
+        self.last = time.perf_counter()
+        self.fps = 0.0
+
+    def tick(self, framerate=0):
+        now = time.perf_counter()
+        elapsed = now - self.last
+        self.last = now
+        if elapsed > 0:
+            self.fps = 1 / elapsed
+        if framerate:
+            return int(1000 / framerate)
+        return int(elapsed * 1000)
+
+    tick_busy_loop = tick
+
+    def get_fps(self):
+        return self.fps
+
+
+class Recorder:
+    # Timestamps of every frame shown and the stats of every search replayed
+    def __init__(self):
+        self.frames = []
+        self.solves = []
+
+    def shown(self, present):
+        def wrapper(*args, **kwargs):
+            result = present(*args, **kwargs)
+            self.frames.append(time.perf_counter())
+            return result
+        return wrapper
+
+    def replayed(self, replay):
+        def wrapper(result, *args, **kwargs):
+            self.solves.append(result.stats())
+            return replay(result, *args, **kwargs)
+        return wrapper
+
+
+def milliseconds(seconds):
+    ms = np.asarray(seconds) * 1000
+    if not len(ms):
+        return {"mean_ms": 0.0, "p50_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+    return {
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+def patched(obj, name, value, saved):
+    saved.append((obj, name, getattr(obj, name)))
+    setattr(obj, name, value)
+
+
+def run(app, argv=(), script=None, ticks=1000, realtime=False, seed=None, source=None, window=False,
+        profile=False, trace=None):
+    # Run an app until it quits or the tick budget runs out and return its
+    # timings. Input comes from the script unless another source is given
+    # (session.py passes one that records live events), and the window is
+    # only real if asked for. SDL reads the drivers at pygame.init().
+    # profile/trace work like the apps' own --profile and --trace, so the
+    # car, which has no flags, can be profiled too.
+    if not window:
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    if seed is not None:
+        # For anything the apps draw from the global generators (the car's
+        # random brain); mazes and walls get the seed on the command line
+        random.seed(seed)
+        np.random.seed(seed)
+    path = APPS[app]
+    if source is None:
+        source = ScriptedInput(DEFAULT_SCRIPTS[app] if script is None else script, ticks)
+    recorder = Recorder()
+
+    saved = []
+    patched(pygame.event, "get", source.get, saved)
+    patched(pygame.mouse, "get_pressed", source.get_pressed, saved)
+    patched(pygame.mouse, "get_pos", source.get_pos, saved)
+    patched(pygame.display, "flip", recorder.shown(pygame.display.flip), saved)
+    patched(pygame.display, "update", recorder.shown(pygame.display.update), saved)
+    patched(solver, "replay", recorder.replayed(solver.replay), saved)
+    if not realtime:
+        patched(pygame.time, "Clock", FastClock, saved)
+        patched(pygame.time, "wait", lambda ms: 0, saved)
+        patched(pygame.time, "delay", lambda ms: 0, saved)
+
+    folder = os.path.dirname(path)
+    old_argv = sys.argv
+    sys.argv = [path] + list(argv)
+    sys.path.insert(0, folder)
+    begin = time.perf_counter()
+    sections = None
+    try:
+        with profiler.profiling(profile or trace, trace, profile) as sections:
+            runpy.run_path(path, run_name="__main__")
+    except SystemExit as error:
+        # The apps call sys.exit() when they get QUIT in the middle of a
+        # search; anything else (argparse errors) is passed on
+        if error.code not in (None, 0):
+            raise
+    finally:
+        wall = time.perf_counter() - begin
+        sys.argv = old_argv
+        sys.path.remove(folder)
+        for obj, name, value in reversed(saved):
+            setattr(obj, name, value)
+        pygame.quit()
+
+    frames = recorder.frames
+    solve_time = sum(s["elapsed"] for s in recorder.solves)
+    return {
+        "app": app,
+        "args": list(argv),
+        "wall_s": round(wall, 4),
+        "ticks": source.tick,
+        "frames": len(frames),
+        "fps": round((len(frames) - 1) / (frames[-1] - frames[0]), 1) if len(frames) > 1 else 0.0,
+        "frame_time": milliseconds(np.diff(frames)),
+        "events": source.delivered,
+        "events_per_s": round(source.delivered / wall, 1),
+        "ticks_per_s": round(source.tick / wall, 1),
+        "solves": len(recorder.solves),
+        "solve_ms": round(solve_time * 1000, 3),
+        "nodes_per_s": round(sum(s["nodes_expanded"] for s in recorder.solves) / solve_time, 1)
+                       if solve_time else 0.0,
+        "searches": [[s["found"], s["path_length"], s["nodes_expanded"]] for s in recorder.solves],
+        "sections": sections.stats() if sections is not None else None,
+    }
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    app_argv = []
+    if "--" in argv:
+        split = argv.index("--")
+        argv, app_argv = argv[:split], argv[split + 1:]
+
+    parser = argparse.ArgumentParser(description="Run a pygame app without a display and time it")
+    parser.add_argument("app", choices=list(APPS))
+    parser.add_argument("--ticks", type=int, default=1000, help="event polls before the app is sent QUIT")
+    parser.add_argument("--script", metavar="FILE", help="JSON event script (default: a built-in one)")
+    parser.add_argument("--realtime", action="store_true", help="keep the apps' frame-rate caps and waits")
+    parser.add_argument("--seed", type=int, default=None, help="seed for Python's and NumPy's global generators")
+    parser.add_argument("--profile", action="store_true", help="draw the frame timings overlay into the frames")
+    parser.add_argument("--trace", metavar="FILE", help="save frame timings as a Chrome trace")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    script = None
+    if args.script:
+        with open(args.script) as f:
+            script = json.load(f)
+
+    report = run(args.app, app_argv, script, args.ticks, args.realtime, args.seed,
+                 profile=args.profile, trace=args.trace)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print_report(report)
+
+
+def print_report(report):
+    frame = report["frame_time"]
+    print(f"{report['app']}: {report['frames']} frames in {report['wall_s']:.2f} s ({report['fps']:.1f} FPS), "
+          f"frame time p50 {frame['p50_ms']:.2f} ms, p99 {frame['p99_ms']:.2f} ms, max {frame['max_ms']:.2f} ms")
+    print(f"{report['events']} events over {report['ticks']} ticks "
+          f"({report['events_per_s']:.1f} events/s, {report['ticks_per_s']:.1f} ticks/s)")
+    if report["solves"]:
+        print(f"{report['solves']} searches solved in {report['solve_ms']:.2f} ms "
+              f"({report['nodes_per_s']:.0f} nodes/s)")
+    sections = report["sections"]
+    if sections:
+        print("per frame: " + ", ".join(f"{name} {sections[name + '_ms']:.3f} ms"
+                                        for name in profiler.SECTIONS))
+
+
+if __name__ == "__main__":
+    main()
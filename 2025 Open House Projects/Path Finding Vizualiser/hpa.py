@@ -0,0 +1,417 @@
+import argparse
+import heapq
+import math
+import time
+
+import numpy as np
+
+import solver
+from grid import WALL, random_grid
+
+# Hierarchical pathfinding (HPA*) for big cell grids. The grid is split into
+# square clusters. Wherever two neighbouring clusters share a run of open
+# cells along their border, one or two "entrance" cell pairs are added to an
+# abstract graph, and entrances inside one cluster are linked by their BFS
+# distance within that cluster. A query searches the small abstract graph
+# and then refines each abstract edge with a local BFS, so far-apart
+# endpoints no longer flood the whole map. Paths are near-optimal, not
+# always shortest.
+#
+# Entrances are found for the whole grid up front (cheap, NumPy slices);
+# the distances inside a cluster are only worked out the first time a
+# search reaches it and are then cached. Editing a cell only recomputes the
+# borders it touches and drops the cached distances of the clusters next
+# to them. Run from this folder, e.g.
+#   python hpa.py --size 1000 --queries 20
+
+# Runs of open border cells at least this long get an entrance at each end
+# instead of one in the middle
+LONG_ENTRANCE = 6
+
+
+def suggested_cluster_size(rows, cols):
+    # Roughly balances the size of the abstract graph against the cost of
+    # searching inside one cluster
+    return max(4, round(math.sqrt(max(rows, cols))))
+
+
+class ClusterIndex:
+    def __init__(self, grid, cluster_size=None):
+        self.grid = grid
+        self.size = cluster_size or suggested_cluster_size(grid.rows, grid.cols)
+        self.cluster_rows = -(-grid.rows // self.size)
+        self.cluster_cols = -(-grid.cols // self.size)
+        # (cluster, right or lower neighbour) -> list of (cell, cell) pairs
+        self.borders = {}
+        # entrance cell -> entrance cells across a border (one step away)
+        self.links = {}
+        # cluster -> {entrance: [(entrance, distance), ...]}, built lazily
+        self.edges = {}
+        for cluster in range(self.cluster_rows * self.cluster_cols):
+            for key in self._lower_borders(cluster):
+                self._build_border(key)
+
+    def cluster_of(self, cell):
+        row, col = divmod(cell, self.grid.cols)
+        return (row // self.size) * self.cluster_cols + col // self.size
+
+    def bounds(self, cluster):
+        # First and one-past-last row and column of a cluster
+        cr, cc = divmod(cluster, self.cluster_cols)
+        r0 = cr * self.size
+        c0 = cc * self.size
+        return r0, min(r0 + self.size, self.grid.rows), c0, min(c0 + self.size, self.grid.cols)
+
+    def _lower_borders(self, cluster):
+        # Borders with the cluster to the right and the cluster below
+        cr, cc = divmod(cluster, self.cluster_cols)
+        keys = []
+        if cc + 1 < self.cluster_cols:
+            keys.append((cluster, cluster + 1))
+        if cr + 1 < self.cluster_rows:
+            keys.append((cluster, cluster + self.cluster_cols))
+        return keys
+
+    def _cluster_borders(self, cluster):
+        cr, cc = divmod(cluster, self.cluster_cols)
+        keys = self._lower_borders(cluster)
+        if cc > 0:
+            keys.append((cluster - 1, cluster))
+        if cr > 0:
+            keys.append((cluster - self.cluster_cols, cluster))
+        return keys
+
+    def _side_by_side(self, a, b):
+        # Neighbouring clusters in the same cluster row
+        return a // self.cluster_cols == b // self.cluster_cols
+
+    def _build_border(self, key):
+        grid = self.grid
+        cols = grid.cols
+        a, b = key
+        r0, r1, c0, c1 = self.bounds(a)
+        state = grid.state.reshape(grid.rows, cols)
+        if self._side_by_side(a, b):
+            # Vertical border: cells (row, c1 - 1) and (row, c1)
+            both = (state[r0:r1, c1 - 1] != WALL) & (state[r0:r1, c1] != WALL)
+            first, step, across = r0 * cols + c1 - 1, cols, 1
+        else:
+            # Horizontal border: cells (r1 - 1, col) and (r1, col)
+            both = (state[r1 - 1, c0:c1] != WALL) & (state[r1, c0:c1] != WALL)
+            first, step, across = (r1 - 1) * cols + c0, 1, cols
+
+        # One entrance in the middle of each short run of open pairs, one
+        # at each end of a long run
+        pairs = []
+        both = both.tolist() + [False]
+        run_start = None
+        for i, is_open in enumerate(both):
+            if is_open and run_start is None:
+                run_start = i
+            elif not is_open and run_start is not None:
+                if i - run_start >= LONG_ENTRANCE:
+                    picks = (run_start, i - 1)
+                else:
+                    picks = ((run_start + i - 1) // 2,)
+                for pick in picks:
+                    cell = first + pick * step
+                    pairs.append((cell, cell + across))
+                run_start = None
+
+        for cell, other in self.borders.get(key, ()):
+            self._unlink(cell, other)
+            self._unlink(other, cell)
+        self.borders[key] = pairs
+        for cell, other in pairs:
+            self.links.setdefault(cell, []).append(other)
+            self.links.setdefault(other, []).append(cell)
+
+    def _unlink(self, cell, other):
+        partners = self.links[cell]
+        partners.remove(other)
+        if not partners:
+            del self.links[cell]
+
+    def entrances(self, cluster):
+        cells = set()
+        for key in self._cluster_borders(cluster):
+            side = 0 if key[0] == cluster else 1
+            for pair in self.borders[key]:
+                cells.add(pair[side])
+        return sorted(cells)
+
+    def _passable(self, cluster):
+        # The cluster's open cells with a one-cell blocked border, so
+        # searches inside it need no bounds checks
+        r0, r1, c0, c1 = self.bounds(cluster)
+        state = self.grid.state.reshape(self.grid.rows, self.grid.cols)
+        passable = np.zeros((r1 - r0 + 2, c1 - c0 + 2), dtype=bool)
+        passable[1:-1, 1:-1] = state[r0:r1, c0:c1] != WALL
+        return passable, r0, c0
+
+    def _local(self, cluster):
+        # Flat bytearray version of _passable() for Python loops
+        passable, r0, c0 = self._passable(cluster)
+        return bytearray(passable.view(np.uint8).tobytes()), passable.shape[1], r0, c0
+
+    def _bfs(self, local, source, targets, parents=False):
+        # BFS inside one cluster from a grid cell. Returns {cell: distance}
+        # for the reachable targets, and the local parent array when
+        # parents is set.
+        passable, width, r0, c0 = local
+        cols = self.grid.cols
+
+        def to_local(cell):
+            row, col = divmod(cell, cols)
+            return (row - r0 + 1) * width + col - c0 + 1
+
+        dist = [-1] * len(passable)
+        parent = [0] * len(passable) if parents else None
+        start = to_local(source)
+        dist[start] = 0
+        queue = [start]
+        offsets = (width, -width, 1, -1)
+        for current in queue:
+            d = dist[current] + 1
+            for offset in offsets:
+                neighbor = current + offset
+                if passable[neighbor] and dist[neighbor] < 0:
+                    dist[neighbor] = d
+                    if parents:
+                        parent[neighbor] = current
+                    queue.append(neighbor)
+
+        found = {}
+        for cell in targets:
+            d = dist[to_local(cell)]
+            if d >= 0:
+                found[cell] = d
+        return found, parent
+
+    def cluster_edges(self, cluster):
+        edges = self.edges.get(cluster)
+        if edges is None:
+            edges = self.edges[cluster] = self._entrance_distances(cluster)
+        return edges
+
+    def _entrance_distances(self, cluster):
+        # BFS from every entrance of the cluster at once: one boolean layer
+        # per entrance, all grown by a step with whole-array shifts, until
+        # every pair is connected or no layer can grow
+        cells = self.entrances(cluster)
+        if not cells:
+            return {}
+        passable, r0, c0 = self._passable(cluster)
+        rows, cols = np.divmod(np.array(cells), self.grid.cols)
+        rows = rows - r0 + 1
+        cols = cols - c0 + 1
+        k = len(cells)
+        reached = np.zeros((k,) + passable.shape, dtype=bool)
+        reached[np.arange(k), rows, cols] = True
+        frontier = reached.copy()
+        grow = np.empty_like(reached)
+        dist = np.full((k, k), -1, dtype=np.int32)
+        np.fill_diagonal(dist, 0)
+
+        step = 0
+        while True:
+            step += 1
+            grow[:] = False
+            grow[:, 1:, :] |= frontier[:, :-1, :]
+            grow[:, :-1, :] |= frontier[:, 1:, :]
+            grow[:, :, 1:] |= frontier[:, :, :-1]
+            grow[:, :, :-1] |= frontier[:, :, 1:]
+            grow &= passable
+            grow &= ~reached
+            if not grow.any():
+                break
+            reached |= grow
+            frontier, grow = grow, frontier
+            dist[frontier[:, rows, cols] & (dist < 0)] = step
+            if (dist >= 0).all():
+                break
+
+        edges = {}
+        for i, cell in enumerate(cells):
+            edges[cell] = [(cells[j], int(d)) for j, d in enumerate(dist[i].tolist()) if d > 0]
+        return edges
+
+    def update(self, cell):
+        # Call after a cell turns into a wall or back into an open cell
+        cluster = self.cluster_of(cell)
+        row, col = divmod(cell, self.grid.cols)
+        r0, r1, c0, c1 = self.bounds(cluster)
+        dirty = {cluster}
+        for key in self._cluster_borders(cluster):
+            other = key[1] if key[0] == cluster else key[0]
+            if self._side_by_side(cluster, other):
+                on_border = col == (c0 if other < cluster else c1 - 1)
+            else:
+                on_border = row == (r0 if other < cluster else r1 - 1)
+            if on_border:
+                self._build_border(key)
+                dirty.add(other)
+        for key in dirty:
+            self.edges.pop(key, None)
+
+    def path_inside(self, cluster, start, end):
+        # Shortest path between two cells of one cluster (None if none)
+        local = self._local(cluster)
+        found, parent = self._bfs(local, start, (end,), parents=True)
+        if end not in found:
+            return None
+        passable, width, r0, c0 = local
+        cols = self.grid.cols
+
+        def to_cell(i):
+            row, col = divmod(i, width)
+            return (row - 1 + r0) * cols + col - 1 + c0
+
+        row, col = divmod(end, cols)
+        current = (row - r0 + 1) * width + col - c0 + 1
+        path = [end]
+        for _ in range(found[end]):
+            current = parent[current]
+            path.append(to_cell(current))
+        path.reverse()
+        return path
+
+    def search(self, start, end):
+        # Abstract A* from start to end, refined into a full cell path.
+        # expanded/discovered hold abstract nodes (entrance cells).
+        start_time = time.perf_counter()
+        cols = self.grid.cols
+        end_row, end_col = divmod(end, cols)
+        start_cluster = self.cluster_of(start)
+        end_cluster = self.cluster_of(end)
+
+        # Connect start and end to the entrances of their own clusters
+        local = self._local(start_cluster)
+        targets = self.entrances(start_cluster)
+        if start_cluster == end_cluster:
+            targets.append(end)
+        start_edges = [(cell, d) for cell, d in self._bfs(local, start, targets)[0].items() if cell != start]
+        if end_cluster != start_cluster:
+            local = self._local(end_cluster)
+        to_end = self._bfs(local, end, self.entrances(end_cluster))[0]
+
+        g_score = {start: 0}
+        came_from = {}
+        closed = set()
+        count = 0
+        # Heap of (f, h, count, cell): ties go to the node nearer the end
+        open_set = [(0, 0, count, start)]
+        expanded = []
+        discovered = []
+        found = start == end
+
+        while open_set and not found:
+            current = heapq.heappop(open_set)[3]
+            if current in closed:
+                continue
+            closed.add(current)
+            expanded.append(current)
+            opened = []
+            discovered.append(opened)
+            if current == end:
+                found = True
+                break
+
+            g = g_score[current]
+            if current == start:
+                steps = list(start_edges)
+            else:
+                steps = list(self.cluster_edges(self.cluster_of(current)).get(current, ()))
+            steps.extend((other, 1) for other in self.links.get(current, ()))
+            if current in to_end:
+                steps.append((end, to_end[current]))
+
+            for neighbor, cost in steps:
+                if neighbor in closed:
+                    continue
+                temp_g_score = g + cost
+                if neighbor not in g_score:
+                    opened.append(neighbor)
+                elif temp_g_score >= g_score[neighbor]:
+                    continue
+                g_score[neighbor] = temp_g_score
+                came_from[neighbor] = current
+                row, col = divmod(neighbor, cols)
+                h = abs(row - end_row) + abs(col - end_col)
+                count += 1
+                heapq.heappush(open_set, (temp_g_score + h, h, count, neighbor))
+
+        if not found:
+            return solver.SearchResult(False, [], expanded, discovered, time.perf_counter() - start_time)
+
+        # Refine: entrance pairs are adjacent cells, everything else is a
+        # path inside one cluster
+        nodes = solver.reconstruct_path(came_from, start, end) if start != end else [start]
+        path = [start]
+        for a, b in zip(nodes, nodes[1:]):
+            cluster = self.cluster_of(a)
+            if cluster != self.cluster_of(b):
+                path.append(b)
+            else:
+                path.extend(self.path_inside(cluster, a, b)[1:])
+        return solver.SearchResult(True, path, expanded, discovered, time.perf_counter() - start_time)
+
+
+def hpa_star(graph, start, end, index=None):
+    # Pass a ClusterIndex to reuse it between queries; building one is the
+    # expensive part
+    if index is None:
+        index = ClusterIndex(graph)
+    return index.search(start, end)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare HPA* with A* on a big random grid")
+    parser.add_argument("--size", type=int, default=1000)
+    parser.add_argument("--density", type=float, default=0.25, help="wall density")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cluster", type=int, help="cluster size (default: about sqrt(size))")
+    parser.add_argument("--queries", type=int, default=10)
+    parser.add_argument("--edits", type=int, default=10, help="walls toggled between queries")
+    args = parser.parse_args(argv)
+
+    grid = random_grid(args.size, density=args.density, seed=args.seed)
+    rng = np.random.default_rng(args.seed)
+    open_cells = np.flatnonzero(grid.state != WALL)
+
+    begin = time.perf_counter()
+    index = ClusterIndex(grid, args.cluster)
+    print(f"{args.size}x{args.size} grid, {index.size}x{index.size} clusters, "
+          f"{len(index.links)} entrances found in {time.perf_counter() - begin:.3f} s")
+
+    # Far-apart endpoints: one in the top-left quarter, one in the bottom-right
+    quarter = args.size // 4
+    near = open_cells[(open_cells // args.size < quarter) & (open_cells % args.size < quarter)]
+    far = open_cells[(open_cells // args.size >= 3 * quarter) & (open_cells % args.size >= 3 * quarter)]
+
+    for query in range(args.queries):
+        start, end = int(rng.choice(near)), int(rng.choice(far))
+        exact = solver.a_star(grid, start, end)
+        first = index.search(start, end)
+        if not first.found:
+            print(f"query {query}: {'no path' if not exact.found else 'HPA* missed a path'}")
+            continue
+
+        # Toggle some walls, then ask again: only clusters next to the
+        # edits are rebuilt
+        begin = time.perf_counter()
+        for _ in range(args.edits):
+            cell = int(rng.choice(open_cells))
+            if cell not in (start, end):
+                grid.set(cell, WALL if grid.get(cell) != WALL else 0)
+                index.update(cell)
+        edit_time = time.perf_counter() - begin
+        again = index.search(start, end)
+
+        print(f"query {query}: A* {exact.elapsed * 1000:7.1f} ms ({exact.nodes_expanded} nodes, "
+              f"length {len(exact.path) - 1}) | HPA* first {first.elapsed * 1000:7.1f} ms "
+              f"({first.nodes_expanded} nodes, length {len(first.path) - 1}), "
+              f"after {args.edits} edits {(edit_time + again.elapsed) * 1000:6.1f} ms")
+
+if __name__ == "__main__":
+    main()
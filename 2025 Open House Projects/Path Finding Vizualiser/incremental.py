@@ -0,0 +1,178 @@
+import argparse
+import heapq
+import time
+
+import numpy as np
+
+import solver
+from grid import WALL, random_grid
+
+# Lifelong Planning A* (LPA*): an A* that keeps its search state between
+# runs. After some cells turn into walls or back into open cells, update()
+# marks just those cells and compute() repairs the shortest path,
+# re-expanding only the cells whose distance from the start actually
+# changed. Start and end stay fixed for the life of a planner (D* Lite is
+# the variant for a moving start). Run from this folder, e.g.
+#   python incremental.py --size 300 --edits 20
+
+INF = float("inf")
+
+
+class LPAStar:
+    def __init__(self, grid, start, end):
+        self.grid = grid
+        self.start = start
+        self.end = end
+        n = len(grid)
+        # g: distance from start as of the last expansion; rhs: one-step
+        # lookahead from the neighbours' g. A cell is consistent when the
+        # two agree and only inconsistent cells sit in the queue.
+        self.g = [INF] * n
+        self.rhs = [INF] * n
+        self.rhs[start] = 0
+        self.queued = {}  # cell -> key it was last pushed with
+        self.open_set = []
+        self._push(start)
+
+    def _around(self, i):
+        # All in-bounds neighbours, walls included
+        cols = self.grid.cols
+        row, col = divmod(i, cols)
+        cells = []
+        if row < self.grid.rows - 1:
+            cells.append(i + cols)
+        if row > 0:
+            cells.append(i - cols)
+        if col < cols - 1:
+            cells.append(i + 1)
+        if col > 0:
+            cells.append(i - 1)
+        return cells
+
+    def _key(self, i):
+        g = min(self.g[i], self.rhs[i])
+        row, col = divmod(i, self.grid.cols)
+        end_row, end_col = divmod(self.end, self.grid.cols)
+        return (g + abs(row - end_row) + abs(col - end_col), g)
+
+    def _push(self, i):
+        key = self._key(i)
+        self.queued[i] = key
+        heapq.heappush(self.open_set, (key, i))
+
+    def _top_key(self):
+        # Drop heap entries that were superseded or removed
+        open_set = self.open_set
+        while open_set:
+            key, i = open_set[0]
+            if self.queued.get(i) == key:
+                return key
+            heapq.heappop(open_set)
+        return (INF, INF)
+
+    def _update_vertex(self, i):
+        # Recompute rhs from the neighbours and (un)queue the cell
+        if i != self.start:
+            if self.grid.is_wall(i):
+                best = INF
+            else:
+                g = self.g
+                best = INF
+                for neighbor in self.grid.neighbors(i):
+                    if g[neighbor] < best:
+                        best = g[neighbor]
+                best += 1
+            self.rhs[i] = best
+        self.queued.pop(i, None)
+        if self.g[i] != self.rhs[i]:
+            self._push(i)
+            return True
+        return False
+
+    def update(self, cell):
+        # Call after a cell turns into a wall or back into an open cell
+        self._update_vertex(cell)
+        for neighbor in self._around(cell):
+            self._update_vertex(neighbor)
+
+    def compute(self):
+        # Repair the shortest path. expanded/discovered cover only the
+        # cells touched by this call, i.e. the repaired region.
+        start_time = time.perf_counter()
+        g = self.g
+        rhs = self.rhs
+        end = self.end
+        expanded = []
+        discovered = []
+
+        while self._top_key() < self._key(end) or rhs[end] != g[end]:
+            i = heapq.heappop(self.open_set)[1]
+            del self.queued[i]
+            expanded.append(i)
+            opened = []
+            discovered.append(opened)
+
+            if g[i] > rhs[i]:
+                # Distance went down: settle it and tell the neighbours
+                g[i] = rhs[i]
+            else:
+                # Distance went up: re-queue the cell itself as well
+                g[i] = INF
+                if self._update_vertex(i):
+                    opened.append(i)
+            for neighbor in self._around(i):
+                if self._update_vertex(neighbor):
+                    opened.append(neighbor)
+
+        path = self.path()
+        return solver.SearchResult(bool(path), path, expanded, discovered, time.perf_counter() - start_time)
+
+    def path(self):
+        # Walk back from the end along cells whose g is one less
+        g = self.g
+        if g[self.end] == INF:
+            return []
+        path = [self.end]
+        current = self.end
+        while current != self.start:
+            current = min(self.grid.neighbors(current), key=g.__getitem__)
+            path.append(current)
+        path.reverse()
+        return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare LPA* repairs with A* from scratch")
+    parser.add_argument("--size", type=int, default=300)
+    parser.add_argument("--density", type=float, default=0.25, help="wall density")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--edits", type=int, default=20, help="single-cell wall toggles")
+    args = parser.parse_args(argv)
+
+    grid = random_grid(args.size, density=args.density, seed=args.seed)
+    rng = np.random.default_rng(args.seed)
+    start, end = 0, len(grid) - 1
+
+    planner = LPAStar(grid, start, end)
+    result = planner.compute()
+    print(f"{args.size}x{args.size} grid, first plan: {result.nodes_expanded} nodes "
+          f"in {result.elapsed * 1000:.1f} ms")
+
+    for edit in range(args.edits):
+        # Toggle a cell on the current path half the time, so the path
+        # really has to change
+        if planner.path() and edit % 2 == 0:
+            cell = int(rng.choice(planner.path()[1:-1]))
+        else:
+            cell = int(rng.integers(1, len(grid) - 1))
+        grid.set(cell, 0 if grid.is_wall(cell) else WALL)
+        planner.update(cell)
+        repair = planner.compute()
+        scratch = solver.a_star(grid, start, end)
+        print(f"edit {edit:3}: LPA* {repair.nodes_expanded:7} nodes {repair.elapsed * 1000:8.2f} ms | "
+              f"A* {scratch.nodes_expanded:7} nodes {scratch.elapsed * 1000:8.2f} ms | "
+              f"length {max(len(repair.path) - 1, 0)}")
+
+
+if __name__ == "__main__":
+    main()
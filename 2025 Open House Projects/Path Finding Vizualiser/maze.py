@@ -0,0 +1,467 @@
+import random
+from array import array
+from collections import deque
+
+import numpy as np
+
+# Headless maze model. Walls are stored as one bitmask per cell, in the
+# order top, right, bottom, left.
+TOP = 1
+RIGHT = 2
+BOTTOM = 4
+LEFT = 8
+ALL_WALLS = TOP | RIGHT | BOTTOM | LEFT
+
+# Bit for each side in that order; the opposite side of index d is d ^ 2
+WALL_BITS = (TOP, RIGHT, BOTTOM, LEFT)
+
+
+class Maze:
+    def __init__(self, rows, cols=None):
+        self.rows = rows
+        self.cols = rows if cols is None else cols
+        # bytearray for fast access from Python loops, NumPy view for the rest
+        self.wall_bits = bytearray([ALL_WALLS]) * (self.rows * self.cols)
+        self.walls = np.frombuffer(self.wall_bits, dtype=np.uint8)
+        # Bumped by generate_maze (and anything else that changes walls) so
+        # cached data (distance fields) can tell when it is stale
+        self.version = 0
+
+    @classmethod
+    def from_buffer(cls, data, rows, cols):
+        # Wrap an existing uint8 array (e.g. a numpy.memmap) without copying
+        maze = cls.__new__(cls)
+        maze.rows = rows
+        maze.cols = cols
+        maze.walls = data
+        maze.wall_bits = memoryview(data)
+        maze.version = 0
+        return maze
+
+    def __len__(self):
+        return len(self.wall_bits)
+
+    def index(self, row, col):
+        return row * self.cols + col
+
+    def pos(self, i):
+        return divmod(i, self.cols)
+
+    def has_wall(self, i, bit):
+        return bool(self.wall_bits[i] & bit)
+
+    def neighbors(self, i):
+        bits = self.wall_bits[i]
+        cols = self.cols
+        neighbors = []
+        if not bits & TOP:
+            neighbors.append(i - cols)
+        if not bits & RIGHT:
+            neighbors.append(i + 1)
+        if not bits & BOTTOM:
+            neighbors.append(i + cols)
+        if not bits & LEFT:
+            neighbors.append(i - 1)
+        return neighbors
+
+
+def _padded(maze):
+    # Copy the walls into a grid with a one-cell border around the maze so
+    # moves never need bounds checks. Returns the padded width, the padded
+    # wall bytes and a bytearray that is 1 on the border.
+    rows, cols = maze.rows, maze.cols
+    width = cols + 2
+    walls = np.full((rows + 2, width), ALL_WALLS, dtype=np.uint8)
+    walls[1:-1, 1:-1] = maze.walls.reshape(rows, cols)
+    outside = np.ones((rows + 2, width), dtype=np.uint8)
+    outside[1:-1, 1:-1] = 0
+    return width, bytearray(walls.tobytes()), bytearray(outside.tobytes())
+
+
+def _unpad(maze, width, bits):
+    walls = np.frombuffer(bits, dtype=np.uint8).reshape(maze.rows + 2, width)
+    maze.walls[:] = walls[1:-1, 1:-1].ravel()
+
+
+def backtracker(maze, rng):
+    # Recursive backtracker (depth-first search with an explicit stack).
+    # Long winding corridors, few dead ends.
+    width, bits, visited = _padded(maze)  # the border counts as visited
+    offsets = (-width, 1, width, -1)
+    rand = rng.random
+    start = width + 1
+    visited[start] = 1
+    stack = [start]
+
+    while stack:
+        current = stack[-1]
+        options = []
+        if not visited[current - width]:
+            options.append(0)
+        if not visited[current + 1]:
+            options.append(1)
+        if not visited[current + width]:
+            options.append(2)
+        if not visited[current - 1]:
+            options.append(3)
+
+        if not options:
+            stack.pop()
+            continue
+
+        d = options[int(rand() * len(options))]
+        next_cell = current + offsets[d]
+        bits[current] &= ~WALL_BITS[d]
+        bits[next_cell] &= ~WALL_BITS[d ^ 2]
+        visited[next_cell] = 1
+        stack.append(next_cell)
+
+    _unpad(maze, width, bits)
+
+
+def kruskal(maze, rng):
+    # Randomized Kruskal: knock down walls in random order whenever they
+    # separate two different trees. That is the minimum spanning tree with
+    # each wall's place in the shuffled order as its weight, and as the
+    # weights are distinct there is only one, so it is found with Boruvka
+    # rounds in NumPy instead of a union-find loop over every wall: each
+    # tree takes its lightest wall to another tree, then the trees are
+    # merged along them.
+    rows, cols = maze.rows, maze.cols
+    n = len(maze)
+
+    # Edge e joins cell e >> 1 to its right (e & 1 == 0) or bottom neighbor
+    ids = np.arange(n, dtype=np.int32).reshape(rows, cols)
+    edges = np.concatenate((ids[:, :-1].ravel() * 2, ids[:-1, :].ravel() * 2 + 1))
+    np.random.default_rng(rng.getrandbits(64)).shuffle(edges)
+    rank = np.arange(len(edges), dtype=np.int32)  # weight, and index into edges
+    a = edges >> 1  # the tree on either side of each edge, to begin with one per cell
+    b = a + np.where(edges & 1, np.int32(cols), np.int32(1))
+    trees = n
+    knocked = [rank[:0]]
+
+    while len(rank):
+        # Lightest edge of every tree (edges are in weight order)
+        order = np.arange(len(rank), dtype=np.int32)
+        lightest = np.full(trees, len(rank), dtype=np.int32)
+        np.minimum.at(lightest, a, order)
+        np.minimum.at(lightest, b, order)
+        has_edge = np.flatnonzero(lightest < len(rank)).astype(np.int32)
+        pick = lightest[has_edge]
+        taken = np.zeros(len(rank), dtype=bool)
+        taken[pick] = True
+        knocked.append(rank[taken])
+
+        # Point every tree at the one its lightest edge leads to; two trees
+        # that picked the same edge point at each other, and the lower one
+        # becomes the root of the merged tree
+        near = a[pick]
+        far = np.where(near == has_edge, b[pick], near)
+        parent = np.arange(trees, dtype=np.int32)
+        parent[has_edge] = far
+        root = has_edge[(parent[far] == has_edge) & (has_edge < far)]
+        parent[root] = root
+        while True:
+            up = parent[parent]
+            if np.array_equal(up, parent):
+                break
+            parent = up
+
+        # Number the merged trees 0, 1, ... and drop the edges inside them
+        label = np.cumsum(parent == np.arange(trees, dtype=np.int32), dtype=np.int32) - 1
+        parent = label[parent]
+        trees = int(label[-1]) + 1
+        a = parent[a]
+        b = parent[b]
+        between = a != b
+        a, b, rank = a[between], b[between], rank[between]
+
+    knocked = edges[np.concatenate(knocked)]
+    right = knocked[knocked & 1 == 0] >> 1
+    down = knocked[knocked & 1 == 1] >> 1
+    walls = maze.walls
+    walls[right] &= ALL_WALLS ^ RIGHT
+    walls[right + 1] &= ALL_WALLS ^ LEFT
+    walls[down] &= ALL_WALLS ^ BOTTOM
+    walls[down + cols] &= ALL_WALLS ^ TOP
+
+
+def prim(maze, rng):
+    # Randomized Prim: grow one tree from a random cell, each time joining
+    # a random frontier cell to a random neighbor already in the tree.
+    # Short branches and many dead ends.
+    width, bits, mark = _padded(maze)
+    offsets = (-width, 1, width, -1)
+    rand = rng.random
+    IN_MAZE, FRONTIER = 2, 3  # mark is 1 on the border, 0 elsewhere
+    frontier = []
+
+    start = (int(rand() * maze.rows) + 1) * width + int(rand() * maze.cols) + 1
+    cell = start
+    while True:
+        mark[cell] = IN_MAZE
+        for offset in offsets:
+            neighbor = cell + offset
+            if not mark[neighbor]:
+                mark[neighbor] = FRONTIER
+                frontier.append(neighbor)
+
+        if not frontier:
+            break
+        k = int(rand() * len(frontier))
+        cell = frontier[k]
+        frontier[k] = frontier[-1]
+        frontier.pop()
+
+        options = []
+        if mark[cell - width] == IN_MAZE:
+            options.append(0)
+        if mark[cell + 1] == IN_MAZE:
+            options.append(1)
+        if mark[cell + width] == IN_MAZE:
+            options.append(2)
+        if mark[cell - 1] == IN_MAZE:
+            options.append(3)
+        d = options[int(rand() * len(options))]
+        bits[cell] &= ~WALL_BITS[d]
+        bits[cell + offsets[d]] &= ~WALL_BITS[d ^ 2]
+
+    _unpad(maze, width, bits)
+
+
+LONG_WALK = 512  # steps after which a Wilson walk goes on in NumPy chunks
+_STEP_X = np.array([0, 1, 0, -1])  # x and y change of each direction
+_STEP_Y = np.array([-1, 0, 1, 0])
+
+
+def _fold(x, size):
+    # Where an unbounded walk at x lands when folded back into 0..size-1:
+    # a step off the edge becomes a step that stays put
+    x = np.mod(x, 2 * size)
+    return np.where(x >= size, 2 * size - 1 - x, x)
+
+
+def _long_walk(cell, maze, width, in_tree, walk, last_exit, clock, gen):
+    # Go on with a random walk from cell until it reaches the tree, many
+    # steps at a time. Steps off the maze are skipped in wilson(); here the
+    # walk stays put instead, which gives the same moves, and a walk that
+    # stays put at the edges is an unbounded walk folded into the maze.
+    # Each cell keeps the direction of the last step out of it (last_exit
+    # holds that step's time on clock). Returns the tree cell reached and
+    # the clock.
+    rows, cols = maze.rows, maze.cols
+    row, col = divmod(cell, width)
+    y, x = row - 1, col - 1
+    chunk = 1024
+    while True:
+        d = gen.integers(0, 4, chunk)
+        xs = x + np.cumsum(_STEP_X[d])
+        ys = y + np.cumsum(_STEP_Y[d])
+        cells = (_fold(ys, rows) + 1) * width + _fold(xs, cols) + 1
+        hits = np.flatnonzero(in_tree[cells])
+        end = hits[0] + 1 if len(hits) else chunk
+        after = cells[:end]
+        before = np.concatenate(([cell], after[:-1]))
+        moved = np.flatnonzero(after != before)
+        exits = before[moved]
+        delta = after[moved] - exits
+        times = clock + moved
+        np.maximum.at(last_exit, exits, times)
+        last = last_exit[exits] == times
+        dirs = np.select([delta == -width, delta == 1, delta == width], [0, 1, 2], 3)
+        walk[exits[last]] = dirs[last]
+        clock += chunk
+        cell = int(after[-1])
+        if len(hits):
+            return cell, clock
+        x, y = xs[-1], ys[-1]
+        chunk = min(chunk * 2, 1 << 16)
+
+
+def wilson(maze, rng):
+    # Wilson's algorithm: loop-erased random walks give a uniformly random
+    # spanning tree. Unbiased, but the first walks on a big maze are long,
+    # so walks past LONG_WALK steps are finished by _long_walk.
+    width, bits, outside = _padded(maze)
+    offsets = (-width, 1, width, -1)
+    rand = rng.random
+    in_tree = bytearray(len(bits))
+    in_tree[(int(rand() * maze.rows) + 1) * width + int(rand() * maze.cols) + 1] = 1
+    # Last direction taken out of each cell; overwriting it erases loops
+    walk = bytearray(len(bits))
+    gen = None
+    clock = 0
+    last_exit = None
+
+    for start in range(len(bits)):
+        if in_tree[start] or outside[start]:
+            continue
+
+        cell = start
+        steps = 0
+        while not in_tree[cell]:
+            if steps == LONG_WALK:
+                if gen is None:
+                    gen = np.random.default_rng(rng.getrandbits(64))
+                    last_exit = np.full(len(bits), -1, dtype=np.int64)
+                cell, clock = _long_walk(cell, maze, width, np.frombuffer(in_tree, dtype=np.uint8),
+                                         np.frombuffer(walk, dtype=np.uint8), last_exit, clock, gen)
+                break
+            d = int(rand() * 4)
+            if outside[cell + offsets[d]]:
+                continue
+            walk[cell] = d
+            cell += offsets[d]
+            steps += 1
+
+        cell = start
+        while not in_tree[cell]:
+            d = walk[cell]
+            bits[cell] &= ~WALL_BITS[d]
+            bits[cell + offsets[d]] &= ~WALL_BITS[d ^ 2]
+            in_tree[cell] = 1
+            cell += offsets[d]
+
+    _unpad(maze, width, bits)
+
+
+def _eller_rows(cols, rows, rng):
+    # Eller's algorithm: builds the maze one row at a time, only keeping
+    # track of which set each cell of the current row belongs to. Yields
+    # each finished row as a bytearray of wall bits. rows=None never
+    # closes the maze off, so it can stream forever.
+    rand = rng.random
+    sets = list(range(cols))
+    next_id = cols
+    down = bytearray(cols)  # passages carved into the row below
+    row = 0
+
+    while True:
+        last = rows is not None and row == rows - 1
+        bits = bytearray([ALL_WALLS]) * cols
+        for col in range(cols):
+            if down[col]:
+                bits[col] &= ~TOP
+
+        members = {}
+        for col, set_id in enumerate(sets):
+            members.setdefault(set_id, []).append(col)
+
+        # Randomly join neighbors in different sets (all of them on the
+        # last row so everything ends up connected)
+        for col in range(cols - 1):
+            a, b = sets[col], sets[col + 1]
+            if a != b and (last or rand() < 0.5):
+                bits[col] &= ~RIGHT
+                bits[col + 1] &= ~LEFT
+                # Merge the smaller set into the bigger one
+                if len(members[a]) < len(members[b]):
+                    a, b = b, a
+                for c in members[b]:
+                    sets[c] = a
+                members[a].extend(members.pop(b))
+
+        if last:
+            yield bits
+            return
+
+        # Every set carves at least one passage down; cells below that
+        # are not joined start a new set
+        down = bytearray(cols)
+        next_sets = [-1] * cols
+        for set_id, cells in members.items():
+            carved = [col for col in cells if rand() < 0.5]
+            if not carved:
+                carved = [cells[int(rand() * len(cells))]]
+            for col in carved:
+                bits[col] &= ~BOTTOM
+                down[col] = 1
+                next_sets[col] = set_id
+        for col in range(cols):
+            if next_sets[col] < 0:
+                next_sets[col] = next_id
+                next_id += 1
+        sets = next_sets
+
+        yield bits
+        row += 1
+
+
+def eller_rows(cols, rows=None, seed=None):
+    # Stream a maze row by row using memory proportional to one row.
+    # Walls use the same bits as Maze.walls (top/right/bottom/left).
+    return _eller_rows(cols, rows, random.Random(seed))
+
+
+def eller(maze, rng):
+    cols = maze.cols
+    for row, bits in enumerate(_eller_rows(cols, maze.rows, rng)):
+        maze.wall_bits[row * cols:(row + 1) * cols] = bits
+
+
+# Seconds for a 2000x2000 maze on one core: kruskal 3.3, eller 5.6,
+# backtracker 6.7, prim 9.2, wilson 11.1
+GENERATORS = {
+    "backtracker": backtracker,
+    "kruskal": kruskal,
+    "prim": prim,
+    "wilson": wilson,
+    "eller": eller,
+}
+
+
+def generate_maze(maze, seed=None, algorithm="backtracker"):
+    # Carve a perfect maze (exactly one path between any two cells) into a
+    # Maze that starts with every wall up. The same seed always gives the
+    # same maze.
+    GENERATORS[algorithm](maze, random.Random(seed))
+    maze.version += 1
+    return maze
+
+
+def distance_field(maze, goal):
+    # Number of moves from every cell to goal (BFS from the goal), or -1
+    # where the goal cannot be reached. Returned as a NumPy int32 array.
+    dist = array("i", [-1]) * len(maze)
+    dist[goal] = 0
+    queue = deque([goal])
+    neighbors = maze.neighbors
+    while queue:
+        current = queue.popleft()
+        d = dist[current] + 1
+        for neighbor in neighbors(current):
+            if dist[neighbor] < 0:
+                dist[neighbor] = d
+                queue.append(neighbor)
+    return np.frombuffer(dist, dtype=np.int32)
+
+
+class DistanceField:
+    # Goal distances for a maze, computed once and only recomputed after
+    # the maze changes. Every lookup is O(1).
+    def __init__(self, maze, goal):
+        self.maze = maze
+        self.goal = goal
+        self.version = None
+        self.dist = None
+
+    def field(self):
+        if self.version != self.maze.version:
+            self.dist = distance_field(self.maze, self.goal)
+            self.version = self.maze.version
+        return self.dist
+
+    def distance(self, i):
+        return int(self.field()[i])
+
+    def next_move(self, i):
+        # Neighbor of i that is one step closer to the goal (None at the
+        # goal or when it cannot be reached)
+        dist = self.field()
+        d = dist[i]
+        if d <= 0:
+            return None
+        for neighbor in self.maze.neighbors(i):
+            if dist[neighbor] == d - 1:
+                return neighbor
+        return None
@@ -1,13 +1,21 @@
+import argparse
 import pygame
-import random
-import heapq
 import sys
-import time
 
-# Maze Settings
+import mazefile
+import profiler
+import solver
+import numpy as np
+
+from grid import Grid, EMPTY, START, END, OPEN, PATH
+from maze import Maze, GENERATORS, generate_maze
+from renderer import CellRenderer, MazeMipmap, Viewport, LOD_CELL_SIZE, draw_walls
+
+# Defaults (see the command line flags at the bottom)
 ROWS, COLS = 40,40
 WIDTH = 800
-CELL_SIZE = WIDTH // COLS
+REPLAY_SPEED = 1  # search steps shown per frame
+FPS = 60
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
 GREEN = (0, 255, 0)
@@ -16,201 +24,155 @@ BLUE = (50, 50, 255)
 GREY = (200, 200, 200)
 YELLOW = (255, 255, 0)
 
-pygame.init()
-WIN = pygame.display.set_mode((WIDTH, WIDTH))
-pygame.display.set_caption("Maze Solver - AI Solves 40x40!")
-
-class Cell:
-    def __init__(self, row, col):
-        self.row = row
-        self.col = col
-        self.walls = [True, True, True, True]
-        self.visited = False
-        self.color = WHITE
-
-    def draw(self, win):
-        x = self.col * CELL_SIZE
-        y = self.row * CELL_SIZE
-        pygame.draw.rect(win, self.color, (x, y, CELL_SIZE, CELL_SIZE))
-        if self.walls[0]:
-            pygame.draw.line(win, BLACK, (x, y), (x + CELL_SIZE, y), 1)
-        if self.walls[1]:
-            pygame.draw.line(win, BLACK, (x + CELL_SIZE, y), (x + CELL_SIZE, y + CELL_SIZE), 1)
-        if self.walls[2]:
-            pygame.draw.line(win, BLACK, (x + CELL_SIZE, y + CELL_SIZE), (x, y + CELL_SIZE), 1)
-        if self.walls[3]:
-            pygame.draw.line(win, BLACK, (x, y + CELL_SIZE), (x, y), 1)
-
-    def get_pos(self):
-        return (self.row, self.col)
-
-    def __lt__(self, other):
-        return False
-
-def index(row, col):
-    if row < 0 or col < 0 or row >= ROWS or col >= COLS:
-        return None
-    return row * COLS + col
-
-def generate_maze(grid):
-    stack = []
-    current = grid[0]
-    current.visited = True
-
-    while True:
-        neighbors = []
-
-        def get_unvisited(r, c):
-            i = index(r, c)
-            if i is not None and not grid[i].visited:
-                return grid[i]
-            return None
-
-        top = get_unvisited(current.row - 1, current.col)
-        right = get_unvisited(current.row, current.col + 1)
-        bottom = get_unvisited(current.row + 1, current.col)
-        left = get_unvisited(current.row, current.col - 1)
-
-        if top: neighbors.append(("top", top))
-        if right: neighbors.append(("right", right))
-        if bottom: neighbors.append(("bottom", bottom))
-        if left: neighbors.append(("left", left))
-
-        if neighbors:
-            direction, next_cell = random.choice(neighbors)
-            stack.append(current)
-
-            if direction == "top":
-                current.walls[0] = False
-                next_cell.walls[2] = False
-            elif direction == "right":
-                current.walls[1] = False
-                next_cell.walls[3] = False
-            elif direction == "bottom":
-                current.walls[2] = False
-                next_cell.walls[0] = False
-            elif direction == "left":
-                current.walls[3] = False
-                next_cell.walls[1] = False
-
-            current = next_cell
-            current.visited = True
-        elif stack:
-            current = stack.pop()
-        else:
-            break
-
-def get_neighbors(cell, grid):
-    neighbors = []
-    row, col = cell.row, cell.col
-
-    def is_valid(r, c, wall_dir):
-        i = index(r, c)
-        if i is not None:
-            if wall_dir == 0 and not cell.walls[0]:
-                neighbors.append(grid[i])
-            elif wall_dir == 1 and not cell.walls[1]:
-                neighbors.append(grid[i])
-            elif wall_dir == 2 and not cell.walls[2]:
-                neighbors.append(grid[i])
-            elif wall_dir == 3 and not cell.walls[3]:
-                neighbors.append(grid[i])
-
-    is_valid(row - 1, col, 0)
-    is_valid(row, col + 1, 1)
-    is_valid(row + 1, col, 2)
-    is_valid(row, col - 1, 3)
-
-    return neighbors
-
-def h(p1, p2):
-    return abs(p1[0] - p2[0]) + abs(p1[1] - p2[1])
-
-def reconstruct_path(came_from, current, draw):
-    while current in came_from:
-        current = came_from[current]
-        current.color = BLUE
-        draw()
+# Colors for the search marks, kept in a Grid the size of the maze
+COLORS = {
+    EMPTY: WHITE,
+    START: GREEN,
+    END: RED,
+    OPEN: YELLOW,
+    PATH: BLUE,
+}
+
+# Marks drawn over the maze picture when zoomed far out
+OVERLAY = {
+    OPEN: YELLOW,
+}
 
-def a_star(draw, grid, start, end):
-    count = 0
-    open_set = []
-    heapq.heappush(open_set, (0, count, start))
-    came_from = {}
+def search(draw, marks, walls, start, end, algorithm="astar", speed=REPLAY_SPEED, on_event=None):
+    # Solve on the wall array without drawing, then replay the search
+    result = solver.solve(algorithm, walls, start, end)
 
-    g_score = {cell: float("inf") for cell in grid}
-    g_score[start] = 0
+    def on_open(i):
+        marks.set(i, OPEN)
 
-    f_score = {cell: float("inf") for cell in grid}
-    f_score[start] = h(start.get_pos(), end.get_pos())
+    def on_close(i):
+        pass
 
-    open_set_hash = {start}
+    def on_path(i):
+        marks.set(i, PATH)
 
-    while open_set:
+    def step():
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
-
-        current = heapq.heappop(open_set)[2]
-        open_set_hash.remove(current)
-
-        if current == end:
-            reconstruct_path(came_from, end, draw)
-            end.color = RED
-            start.color = GREEN
-            return True
-
-        for neighbor in get_neighbors(current, grid):
-            temp_g_score = g_score[current] + 1
-
-            if temp_g_score < g_score[neighbor]:
-                came_from[neighbor] = current
-                g_score[neighbor] = temp_g_score
-                f_score[neighbor] = temp_g_score + h(neighbor.get_pos(), end.get_pos())
-
-                if neighbor not in open_set_hash:
-                    count += 1
-                    heapq.heappush(open_set, (f_score[neighbor], count, neighbor))
-                    open_set_hash.add(neighbor)
-                    neighbor.color = YELLOW
-
+            if on_event is not None:
+                on_event(event)
         draw()
 
-    return False
-
-def draw_grid(grid):
-    WIN.fill(GREY)
-    for cell in grid:
-        cell.draw(WIN)
-    pygame.display.update()
-
-def main():
-    grid = [Cell(r, c) for r in range(ROWS) for c in range(COLS)]
-    generate_maze(grid)
-
-    start = grid[0]
-    end = grid[-1]
-    start.color = GREEN
-    end.color = RED
+    solver.replay(result, on_open, on_close, on_path, step, speed)
+    marks.set(end, END)
+    marks.set(start, START)
+    return result
+
+def make_renderer(win, walls):
+    # Walls never change after generate_maze, so they live on the static
+    # layer and are only redrawn when the view moves
+    view = Viewport(walls.cols, walls.rows, *win.get_size(), lod=True)
+    renderer = CellRenderer(win, walls.rows, walls.cols, GREY, view=view)
+    bits = walls.walls.reshape(walls.rows, walls.cols)
+
+    def draw_static(surface, view):
+        x0, x1, y0, y1 = view.visible()
+        draw_walls(surface, bits[y0:y1, x0:x1], view.cell_size, BLACK)
+
+    renderer.draw_static = draw_static
+    renderer.redraw_static()
+    return renderer
+
+def draw_grid(marks, renderer):
+    # Only cells whose mark changed since the last frame are redrawn
+    with profiler.section("draw"):
+        renderer.sync(marks.state, COLORS)
+        renderer.flush()
+
+def draw_far(win, mipmap, view, marks, start, end):
+    # Zoomed out past LOD_CELL_SIZE: the whole frame comes from the maze
+    # mipmap, with the path, start and end drawn on top so they never get
+    # averaged away
+    with profiler.section("draw"):
+        path = np.flatnonzero(marks.state == PATH)
+        mipmap.render(win, view, marks, OVERLAY, [(path, BLUE), ([start], GREEN), ([end], RED)], GREY)
+        pygame.display.update()
+
+def main(rows=ROWS, cols=COLS, seed=None, generator="backtracker", algorithm="astar",
+         load=None, save=None, width=WIDTH, speed=REPLAY_SPEED):
+    if load:
+        walls, seed = mazefile.load(load, kind=mazefile.KIND_WALLS)
+    else:
+        walls = generate_maze(Maze(rows, cols), seed, generator)
+    if save:
+        mazefile.save(save, walls, seed)
+
+    pygame.init()
+    win = pygame.display.set_mode((width, width))
+    pygame.display.set_caption(f"Maze Solver - AI Solves {walls.rows}x{walls.cols}! (wheel: zoom, arrows: pan)")
+
+    marks = Grid(walls.rows, walls.cols)
+    start = 0
+    end = len(walls) - 1
+    marks.set(start, START)
+    marks.set(end, END)
+
+    renderer = make_renderer(win, walls)
+    view = renderer.view
+    mipmap = None  # built the first time the view zooms far out
+    far_view = None  # view of the last far frame, to skip idle redraws
+    searching = True
 
     def draw():
-        draw_grid(grid)
-
-    start_time = time.time()
-    a_star(draw, grid, start, end)
-    total_time = time.time() - start_time
-    print(f"✅ Maze solved in {total_time:.4f} seconds.")
+        nonlocal mipmap, far_view
+        if view.scale() >= LOD_CELL_SIZE:
+            far_view = None
+            draw_grid(marks, renderer)
+            return
+        shown = (view.x, view.y, view.cell_size, view.shrink)
+        if shown == far_view and not searching:
+            return
+        if mipmap is None:
+            mipmap = MazeMipmap(walls)
+        draw_far(win, mipmap, view, marks, start, end)
+        far_view = shown
+
+    def on_event(event):
+        # Wall lines are only drawn when zoomed in far enough to see them
+        if view.handle(event) and view.scale() >= LOD_CELL_SIZE:
+            with profiler.section("draw"):
+                renderer.redraw_static()
+
+    result = search(draw, marks, walls, start, end, algorithm, speed, on_event)
+    searching = False
+    print(f"✅ Maze solved in {result.elapsed:.4f} seconds "
+          f"({result.nodes_expanded} cells expanded).")
     pygame.time.wait(2000)
 
+    clock = pygame.time.Clock()
     run = True
     while run:
+        clock.tick(FPS)
         draw()
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 run = False
+            on_event(event)
 
     pygame.quit()
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Maze solver")
+    parser.add_argument("--size", type=int, default=ROWS, help="rows (and columns) of the maze")
+    parser.add_argument("--cols", type=int, default=None, help="columns if different from --size")
+    parser.add_argument("--width", type=int, default=WIDTH, help="window size in pixels")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--generator", choices=list(GENERATORS), default="backtracker")
+    parser.add_argument("--algorithm", default="astar",
+                        choices=[name for name in solver.ALGORITHMS if name not in solver.CELL_GRID_ONLY])
+    parser.add_argument("--speed", type=int, default=REPLAY_SPEED, help="search steps shown per frame")
+    parser.add_argument("--load", metavar="FILE", help="open a saved .maze file instead of generating")
+    parser.add_argument("--save", metavar="FILE", help="save the maze to a .maze file")
+    parser.add_argument("--profile", action="store_true", help="show frame timings on screen")
+    parser.add_argument("--trace", metavar="FILE", help="save frame timings as a Chrome trace")
+    args = parser.parse_args()
+    with profiler.profiling(args.profile or args.trace, args.trace, args.profile):
+        main(args.size, args.cols or args.size, args.seed, args.generator, args.algorithm,
+             args.load, args.save, args.width, args.speed)
@@ -1,152 +1,225 @@
+import argparse
 import pygame
-import random
-import sys
 
-# Constants
+import mazefile
+import profiler
+from maze import Maze, DistanceField, GENERATORS, TOP, RIGHT, BOTTOM, LEFT, eller_rows, generate_maze
+from renderer import Viewport, draw_walls
+
+# Defaults (see the command line flags at the bottom)
 ROWS, COLS = 8, 8
 WIDTH = 600
-CELL_SIZE = WIDTH // COLS
+FPS = 60
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
 GREEN = (0, 255, 0)
 RED = (255, 0, 0)
 BLUE = (50, 50, 255)
+YELLOW = (255, 220, 0)
 GREY = (180, 180, 180)
 
-pygame.init()
-WIN = pygame.display.set_mode((WIDTH, WIDTH))
-pygame.display.set_caption("Maze Game - You Solve 8x8!")
-
-# Maze Cell
-class Cell:
-    def __init__(self, row, col):
-        self.row = row
-        self.col = col
-        self.walls = [True, True, True, True]  # top, right, bottom, left
-        self.visited = False
-
-    def draw(self, win):
-        x = self.col * CELL_SIZE
-        y = self.row * CELL_SIZE
-
-        if self.visited:
-            pygame.draw.rect(win, WHITE, (x, y, CELL_SIZE, CELL_SIZE))
-
-        if self.walls[0]:
-            pygame.draw.line(win, BLACK, (x, y), (x + CELL_SIZE, y), 2)
-        if self.walls[1]:
-            pygame.draw.line(win, BLACK, (x + CELL_SIZE, y), (x + CELL_SIZE, y + CELL_SIZE), 2)
-        if self.walls[2]:
-            pygame.draw.line(win, BLACK, (x + CELL_SIZE, y + CELL_SIZE), (x, y + CELL_SIZE), 2)
-        if self.walls[3]:
-            pygame.draw.line(win, BLACK, (x, y + CELL_SIZE), (x, y), 2)
-
-    def highlight(self, color):
-        x = self.col * CELL_SIZE
-        y = self.row * CELL_SIZE
-        pygame.draw.rect(WIN, color, (x + 3, y + 3, CELL_SIZE - 6, CELL_SIZE - 6))
-
-def index(row, col):
-    if row < 0 or col < 0 or row >= ROWS or col >= COLS:
-        return None
-    return row * COLS + col
-
-def generate_maze(grid):
-    stack = []
-    current = grid[0]
-    current.visited = True
-
-    while True:
-        neighbors = []
-
-        def get_unvisited(r, c):
-            i = index(r, c)
-            if i is not None and not grid[i].visited:
-                return grid[i]
-            return None
-
-        top = get_unvisited(current.row - 1, current.col)
-        right = get_unvisited(current.row, current.col + 1)
-        bottom = get_unvisited(current.row + 1, current.col)
-        left = get_unvisited(current.row, current.col - 1)
-
-        if top: neighbors.append(("top", top))
-        if right: neighbors.append(("right", right))
-        if bottom: neighbors.append(("bottom", bottom))
-        if left: neighbors.append(("left", left))
-
-        if neighbors:
-            direction, next_cell = random.choice(neighbors)
-            stack.append(current)
-
-            # Knock down walls
-            if direction == "top":
-                current.walls[0] = False
-                next_cell.walls[2] = False
-            elif direction == "right":
-                current.walls[1] = False
-                next_cell.walls[3] = False
-            elif direction == "bottom":
-                current.walls[2] = False
-                next_cell.walls[0] = False
-            elif direction == "left":
-                current.walls[3] = False
-                next_cell.walls[1] = False
-
-            current = next_cell
-            current.visited = True
-        elif stack:
-            current = stack.pop()
-        else:
-            break
+# Streaming mode: columns of the endless maze and rows added per frame
+STREAM_COLS = 40
+STREAM_SPEED = 1
+
+# Arrow key -> wall that blocks the move, and the move in rows and columns
+MOVES = {
+    pygame.K_UP: (TOP, -1, 0),
+    pygame.K_RIGHT: (RIGHT, 0, 1),
+    pygame.K_DOWN: (BOTTOM, 1, 0),
+    pygame.K_LEFT: (LEFT, 0, -1),
+}
+
+def make_layer(walls, view):
+    # Walls never change after generation, so the visible part of the maze
+    # is drawn once (and again only when the view moves); each frame is
+    # then one blit plus the highlighted cells
+    with profiler.section("draw"):
+        layer = pygame.Surface((view.width, view.height))
+        layer.fill(GREY)
+        x0, x1, y0, y1 = view.visible()
+        size = view.cell_size
+        layer.fill(WHITE, (0, 0, (x1 - x0) * size, (y1 - y0) * size))
+        bits = walls.walls.reshape(walls.rows, walls.cols)
+        draw_walls(layer, bits[y0:y1, x0:x1], size, BLACK, 2)
+    return layer
+
+def highlight(win, view, walls, i, color):
+    row, col = walls.pos(i)
+    rect = view.rect(col, row)
+    inset = min(3, view.cell_size // 4)
+    pygame.draw.rect(win, color, rect.inflate(-2 * inset, -2 * inset))
+
+def draw_grid(win, layer, view, walls, player, start, end, hint=None):
+    with profiler.section("draw"):
+        win.blit(layer, (0, 0))
+        highlight(win, view, walls, start, GREEN)
+        highlight(win, view, walls, end, RED)
+        if hint is not None:
+            highlight(win, view, walls, hint, YELLOW)
+        highlight(win, view, walls, player, BLUE)
+        pygame.display.update()
+
+def show_stats(field, player, moves, optimal):
+    # Remaining distance and efficiency so far, both O(1) lookups.
+    # Efficiency is the ground gained on the exit per move, optimal / moves
+    # on arrival; a player further away than at the start is at 0%.
+    left = field.distance(player)
+    progress = max(optimal - left, 0)
+    efficiency = 100 * progress / moves if moves else 100
+    pygame.display.set_caption(f"Maze Game - {left} moves to go, {moves} taken, "
+                               f"{efficiency:.0f}% efficient (H: hint, wheel: zoom)")
+
+def main(rows=ROWS, cols=COLS, seed=None, generator="backtracker", load=None, save=None, width=WIDTH):
+    if load:
+        walls, seed = mazefile.load(load, kind=mazefile.KIND_WALLS)
+    else:
+        walls = generate_maze(Maze(rows, cols), seed, generator)
+    if save:
+        mazefile.save(save, walls, seed)
+
+    pygame.init()
+    win = pygame.display.set_mode((width, width))
+    pygame.display.set_caption(f"Maze Game - You Solve {walls.rows}x{walls.cols}!")
+
+    # Big mazes are shown through a view that follows the player
+    view = Viewport(walls.cols, walls.rows, width, width, min_size=4)
+    layer = make_layer(walls, view)
+
+    player = 0
+    start = 0
+    end = len(walls) - 1
+
+    # Distances to the exit, computed once for this maze
+    field = DistanceField(walls, end)
+    optimal = field.distance(start)
+    moves = 0
+    show_hint = False
+    show_stats(field, player, moves, optimal)
+
+    clock = pygame.time.Clock()
+    run = True
+
+    while run:
+        clock.tick(FPS)
+        row, col = walls.pos(player)
+        if view.follow(col, row):
+            layer = make_layer(walls, view)
+        hint = field.next_move(player) if show_hint else None
+        draw_grid(win, layer, view, walls, player, start, end, hint)
+
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                run = False
+
+            # Arrow keys move the player, so the view only zooms
+            if view.handle(event, pan_keys=False):
+                layer = make_layer(walls, view)
 
-def draw_grid(grid, player, start_cell, end_cell):
-    WIN.fill(GREY)
-    for cell in grid:
-        cell.draw(WIN)
-    start_cell.highlight(GREEN)
-    end_cell.highlight(RED)
-    player.highlight(BLUE)
-    pygame.display.update()
+            if event.type == pygame.KEYDOWN:
+                current = player
+
+                if event.key == pygame.K_h:
+                    show_hint = not show_hint
+                if event.key in MOVES:
+                    bit, dr, dc = MOVES[event.key]
+                    if not walls.has_wall(player, bit):
+                        player += dr * walls.cols + dc
+
+                if player != current:
+                    moves += 1
+                    show_stats(field, player, moves, optimal)
+
+                if player == end:
+                    print(f"🎉 You solved the maze in {moves} moves "
+                          f"(shortest: {optimal}, {100 * optimal / max(moves, 1):.0f}% efficient)!")
+                    pygame.time.delay(1000)
+                    run = False
 
-def main():
-    grid = [Cell(r, c) for r in range(ROWS) for c in range(COLS)]
-    generate_maze(grid)
+    pygame.quit()
 
-    player = grid[0]
-    start_cell = grid[0]
-    end_cell = grid[-1]
+def draw_row_walls(surface, bits, y, size):
+    # Draw one streamed row of wall bits along the line at height y
+    with profiler.section("draw"):
+        draw_walls(surface, [bits], size, BLACK, 2, y)
+
+def stream_main(cols=STREAM_COLS, rows=None, seed=None, speed=STREAM_SPEED, width=WIDTH):
+    # Scroll through a maze generated row by row with Eller's algorithm.
+    # Only the rows on screen are kept, so rows=None runs forever.
+    # UP/DOWN change the scroll speed, SPACE pauses.
+    pygame.init()
+    win = pygame.display.set_mode((width, width))
+    size = max(width // cols, 2)
+    view = pygame.Surface((cols * size, width))
+    view.fill(WHITE)
+    visible = width // size
+    stream = eller_rows(cols, rows, seed)
+    generated = 0
+    paused = False
 
     clock = pygame.time.Clock()
     run = True
 
     while run:
         clock.tick(30)
-        draw_grid(grid, player, start_cell, end_cell)
 
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 run = False
-
             if event.type == pygame.KEYDOWN:
-                r, c = player.row, player.col
-                current = grid[index(r, c)]
-
-                if event.key == pygame.K_UP and not current.walls[0]:
-                    player = grid[index(r - 1, c)]
-                if event.key == pygame.K_RIGHT and not current.walls[1]:
-                    player = grid[index(r, c + 1)]
-                if event.key == pygame.K_DOWN and not current.walls[2]:
-                    player = grid[index(r + 1, c)]
-                if event.key == pygame.K_LEFT and not current.walls[3]:
-                    player = grid[index(r, c - 1)]
-
-                if player == end_cell:
-                    print("🎉 You solved the maze!")
-                    pygame.time.delay(1000)
-                    run = False
+                if event.key == pygame.K_UP:
+                    speed += 1
+                if event.key == pygame.K_DOWN:
+                    speed = max(speed - 1, 1)
+                if event.key == pygame.K_SPACE:
+                    paused = not paused
+
+        if paused:
+            continue
+
+        for _ in range(speed):
+            bits = next(stream, None)
+            if bits is None:
+                break
+            # Fill the screen top-down first, then scroll one row per row
+            if generated < visible:
+                y = generated * size
+            else:
+                view.scroll(0, -size)
+                y = (visible - 1) * size
+                view.fill(WHITE, (0, y, cols * size, width - y))
+            draw_row_walls(view, bits, y, size)
+            generated += 1
+
+        with profiler.section("draw"):
+            win.fill(GREY)
+            win.blit(view, (0, 0))
+            pygame.display.update()
+        pygame.display.set_caption(f"Maze Stream - {generated} rows x {cols} cols")
 
     pygame.quit()
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Maze game")
+    parser.add_argument("--stream", action="store_true",
+                        help="scroll through a maze generated row by row")
+    parser.add_argument("--size", type=int, default=ROWS, help="rows (and columns) of the maze")
+    parser.add_argument("--cols", type=int, default=None,
+                        help=f"columns if different from --size ({STREAM_COLS} in stream mode)")
+    parser.add_argument("--rows", type=int, default=None,
+                        help="rows in stream mode (default: endless)")
+    parser.add_argument("--width", type=int, default=WIDTH, help="window size in pixels")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--generator", choices=list(GENERATORS), default="backtracker")
+    parser.add_argument("--load", metavar="FILE", help="open a saved .maze file instead of generating")
+    parser.add_argument("--save", metavar="FILE", help="save the maze to a .maze file")
+    parser.add_argument("--profile", action="store_true", help="show frame timings on screen")
+    parser.add_argument("--trace", metavar="FILE", help="save frame timings as a Chrome trace")
+    args = parser.parse_args()
+
+    with profiler.profiling(args.profile or args.trace, args.trace, args.profile):
+        if args.stream:
+            stream_main(args.cols or STREAM_COLS, args.rows, args.seed, width=args.width)
+        else:
+            main(args.size, args.cols or args.size, args.seed, args.generator,
+                 args.load, args.save, args.width)
@@ -0,0 +1,84 @@
+import os
+import struct
+
+import numpy as np
+
+from grid import Grid
+from maze import Maze
+
+# Binary file for a Maze (wall bits) or a Grid (cell states):
+#
+#   magic    8 bytes  b"MAZEGRID"
+#   version  uint16   FORMAT_VERSION
+#   kind     uint8    KIND_WALLS or KIND_CELLS
+#   (pad)    uint8
+#   rows     uint32
+#   cols     uint32
+#   seed     int64    generator seed, -1 if unknown
+#   (pad)    to HEADER_SIZE bytes
+#   data     rows * cols bytes, one per cell in row-major order
+#
+# Walls use the low 4 bits of each byte (maze.TOP/RIGHT/BOTTOM/LEFT), cell
+# states are the grid.EMPTY/WALL/... values. All integers are little-endian.
+# Because the data is a plain byte array at a fixed offset, load() maps it
+# with numpy.memmap instead of reading it, so huge mazes open instantly.
+
+MAGIC = b"MAZEGRID"
+FORMAT_VERSION = 1
+KIND_WALLS = 1
+KIND_CELLS = 2
+KIND_NAMES = {KIND_WALLS: "maze", KIND_CELLS: "grid"}
+HEADER = struct.Struct("<8sHBxIIq")
+HEADER_SIZE = 32
+
+
+class MazeFileError(ValueError):
+    pass
+
+
+def save(path, board, seed=None):
+    # board is a Maze or a Grid. It may be a load() of this very file, so
+    # the new file is written next to it and then moved over it: the old
+    # one stays whole (and mapped) until then.
+    kind = KIND_WALLS if isinstance(board, Maze) else KIND_CELLS
+    data = board.walls if kind == KIND_WALLS else board.state
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, kind, board.rows, board.cols,
+                         -1 if seed is None else seed)
+    temp = os.fspath(path) + ".tmp"
+    try:
+        with open(temp, "wb") as f:
+            f.write(header.ljust(HEADER_SIZE, b"\0"))
+            f.write(np.ascontiguousarray(data, dtype=np.uint8).tobytes())
+        os.replace(temp, path)
+    except BaseException:
+        if os.path.exists(temp):
+            os.remove(temp)
+        raise
+
+
+def read_header(path):
+    with open(path, "rb") as f:
+        raw = f.read(HEADER_SIZE)
+    if len(raw) < HEADER_SIZE:
+        raise MazeFileError(f"{path}: file too short")
+    magic, version, kind, rows, cols, seed = HEADER.unpack_from(raw)
+    if magic != MAGIC:
+        raise MazeFileError(f"{path}: not a maze file")
+    if version != FORMAT_VERSION:
+        raise MazeFileError(f"{path}: unsupported format version {version}")
+    if kind not in (KIND_WALLS, KIND_CELLS):
+        raise MazeFileError(f"{path}: unknown kind {kind}")
+    return kind, rows, cols, None if seed < 0 else seed
+
+
+def load(path, mode="c", kind=None):
+    # Map the cell bytes straight from disk. The default copy-on-write mode
+    # lets the board be edited without touching the file; use mode="r" for
+    # read-only or "r+" to write changes back. With kind (KIND_WALLS or
+    # KIND_CELLS) a file holding the other kind of board is an error.
+    found, rows, cols, seed = read_header(path)
+    if kind is not None and found != kind:
+        raise MazeFileError(f"{path}: holds a {KIND_NAMES[found]}, not a {KIND_NAMES[kind]}")
+    data = np.memmap(path, dtype=np.uint8, mode=mode, offset=HEADER_SIZE, shape=(rows * cols,))
+    cls = Maze if found == KIND_WALLS else Grid
+    return cls.from_buffer(data, rows, cols), seed
@@ -1,14 +1,20 @@
+import argparse
 import pygame
 import sys
 
-# Initialize Pygame
-pygame.init()
+import hpa
+import incremental
+import mazefile
+import profiler
+import solver
+from renderer import CellRenderer, Viewport
+from grid import Grid, EMPTY, WALL, START, END, OPEN, CLOSED, PATH, JUMP, random_grid
 
-# Constants
+# Defaults (see the command line flags at the bottom)
 WIDTH = 600
 ROWS = 10
-WIN = pygame.display.set_mode((WIDTH, WIDTH))
-pygame.display.set_caption("Pathfinding Visualizer")
+REPLAY_SPEED = 1  # search steps shown per frame
+SAVE_FILE = "grid.maze"  # written by S, read back by L
 
 # Colors
 WHITE = (255, 255, 255)
@@ -16,223 +22,261 @@ GREY = (200, 200, 200)
 BLACK = (0, 0, 0)
 GREEN = (0, 255, 0)
 RED = (255, 0, 0)
-
-# Node Class
-class Node:
-    def __init__(self, row, col, width, total_rows):
-        self.row = row
-        self.col = col
-        self.x = row * width
-        self.y = col * width
-        self.color = WHITE
-        self.width = width
-        self.total_rows = total_rows
-
-    def get_pos(self):
-        return self.row, self.col
-
-    def is_closed(self):
-        return self.color == RED
-
-    def is_open(self):
-        return self.color == GREEN
-
-    def is_wall(self):
-        return self.color == BLACK
-
-    def is_start(self):
-        return self.color == (0, 255, 0)
-
-    def is_end(self):
-        return self.color == (255, 0, 0)
-
-    def reset(self):
-        self.color = WHITE
-
-    def make_start(self):
-        self.color = GREEN
-
-    def make_closed(self):
-        self.color = RED
-
-    def make_open(self):
-        self.color = (0, 255, 255)
-
-    def make_wall(self):
-        self.color = BLACK
-
-    def make_end(self):
-        self.color = RED
-
-    def make_path(self):
-        self.color = (128, 0, 128)
-
-    def draw(self, win):
-        pygame.draw.rect(win, self.color, (self.x, self.y, self.width, self.width))
-
-    def __lt__(self, other):
-        return False
+PURPLE = (128, 0, 128)
+CYAN = (0, 255, 255)
+ORANGE = (255, 165, 0)
+
+# Colors for each cell state stored in the grid
+COLORS = {
+    EMPTY: WHITE,
+    WALL: BLACK,
+    START: GREEN,
+    END: RED,
+    OPEN: CYAN,
+    CLOSED: RED,
+    PATH: PURPLE,
+    JUMP: ORANGE,
+}
 
 # Functions
-def make_grid(rows, width):
-    grid = []
-    gap = width // rows
-    for i in range(rows):
-        grid.append([])
-        for j in range(rows):
-            node = Node(i, j, gap, rows)
-            grid[i].append(node)
-    return grid
-
-def draw_grid(win, rows, width):
-    gap = width // rows
-    for i in range(rows):
-        pygame.draw.line(win, GREY, (0, i * gap), (width, i * gap))
-        for j in range(rows):
-            pygame.draw.line(win, GREY, (j * gap, 0), (j * gap, width))
-
-def draw(win, grid, rows, width):
-    win.fill(WHITE)
-    for row in grid:
-        for node in row:
-            node.draw(win)
-    draw_grid(win, rows, width)
-    pygame.display.update()
-
-def get_clicked_pos(pos, rows, width):
-    gap = width // rows
-    y, x = pos
-    row = y // gap
-    col = x // gap
+def make_grid(rows, cols=None, density=0, seed=None):
+    if density:
+        return random_grid(rows, cols, density, seed)
+    return Grid(rows, cols)
+
+def draw_grid(win, view):
+    # Lines between the visible cells; left out when zoomed too far out
+    gap = view.cell_size
+    if gap < 4:
+        return
+    x0, x1, y0, y1 = view.visible()
+    right, bottom = (x1 - x0) * gap, (y1 - y0) * gap
+    for i in range(y1 - y0 + 1):
+        pygame.draw.line(win, GREY, (0, i * gap), (right, i * gap))
+    for j in range(x1 - x0 + 1):
+        pygame.draw.line(win, GREY, (j * gap, 0), (j * gap, bottom))
+
+def make_renderer(win, grid):
+    # Grid lines never change, so they live on the renderer's static layer.
+    # Rows run along x.
+    view = Viewport(grid.rows, grid.cols, *win.get_size())
+    renderer = CellRenderer(win, grid.rows, grid.cols, WHITE, transpose=True, view=view)
+    renderer.draw_static = draw_grid
+    renderer.redraw_static()
+    return renderer
+
+def draw(renderer, grid):
+    # Only cells whose state changed since the last frame are redrawn
+    with profiler.section("draw"):
+        renderer.sync(grid.state, COLORS)
+        renderer.flush()
+
+def get_clicked_pos(pos, view):
+    # Rows run along x
+    row, col = view.cell_at(pos)
     return row, col
 
-import heapq
-
-def h(p1, p2):  # Heuristic: Manhattan distance
-    x1, y1 = p1
-    x2, y2 = p2
-    return abs(x1 - x2) + abs(y1 - y2)
-
-def reconstruct_path(came_from, current, draw):
-    while current in came_from:
-        current = came_from[current]
-        current.make_path()
-        draw()
+def search(draw, grid, start, end, algorithm=solver.a_star, speed=None, **options):
+    # Solve headlessly, then animate the recorded search
+    result = algorithm(grid, start, end, **options)
+    # Jump Point Search and HPA* only expand a few key cells (jump points,
+    # cluster entrances), so show them separately
+    sparse = algorithm is solver.jump_point_search or algorithm is hpa.hpa_star
+    closed_state = JUMP if sparse else CLOSED
 
-def a_star(draw, grid, start, end):
-    count = 0
-    open_set = []
-    heapq.heappush(open_set, (0, count, start))
-    came_from = {}
+    def on_open(i):
+        grid.set(i, OPEN)
 
-    g_score = {node: float("inf") for row in grid for node in row}
-    g_score[start] = 0
-    f_score = {node: float("inf") for row in grid for node in row}
-    f_score[start] = h(start.get_pos(), end.get_pos())
+    def on_close(i):
+        if i != start and i != end:
+            grid.set(i, closed_state)
 
-    open_set_hash = {start}
+    def on_path(i):
+        if i != start and i != end and grid.get(i) != JUMP:
+            grid.set(i, PATH)
 
-    while open_set:
+    def step():
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
-
-        current = heapq.heappop(open_set)[2]
-        open_set_hash.remove(current)
-
-        if current == end:
-            reconstruct_path(came_from, end, draw)
-            end.make_end()
-            start.make_start()
-            return True
-
-        for neighbor in get_neighbors(current, grid):
-            temp_g_score = g_score[current] + 1
-
-            if temp_g_score < g_score[neighbor]:
-                came_from[neighbor] = current
-                g_score[neighbor] = temp_g_score
-                f_score[neighbor] = temp_g_score + h(neighbor.get_pos(), end.get_pos())
-
-                if neighbor not in open_set_hash:
-                    count += 1
-                    heapq.heappush(open_set, (f_score[neighbor], count, neighbor))
-                    open_set_hash.add(neighbor)
-                    neighbor.make_open()
-
         draw()
 
-        if current != start:
-            current.make_closed()
-
-    return False
-
-def get_neighbors(node, grid):
-    neighbors = []
-    row, col = node.row, node.col
-
-    if row < ROWS - 1 and not grid[row + 1][col].is_wall():  # DOWN
-        neighbors.append(grid[row + 1][col])
-    if row > 0 and not grid[row - 1][col].is_wall():  # UP
-        neighbors.append(grid[row - 1][col])
-    if col < ROWS - 1 and not grid[row][col + 1].is_wall():  # RIGHT
-        neighbors.append(grid[row][col + 1])
-    if col > 0 and not grid[row][col - 1].is_wall():  # LEFT
-        neighbors.append(grid[row][col - 1])
-
-    return neighbors
+    solver.replay(result, on_open, on_close, on_path, step, REPLAY_SPEED if speed is None else speed)
+    grid.set(start, START)
+    grid.set(end, END)
+    print(f"{algorithm.__name__}: path length {max(len(result.path) - 1, 0)}, "
+          f"{result.nodes_expanded} nodes expanded in {result.elapsed * 1000:.2f} ms")
+    return result.found
+
+def jump_point_search(draw, grid, start, end, speed=None):
+    return search(draw, grid, start, end, solver.jump_point_search, speed)
+
+def hpa_star(draw, grid, start, end, index, speed=None):
+    return search(draw, grid, start, end, hpa.hpa_star, speed, index=index)
+
+def replan(grid, planner):
+    # Repair the incremental plan and show only the cells this repair
+    # touched, plus the new path
+    result = planner.compute()
+    grid.clear_search()
+    for i in result.expanded:
+        if i != planner.start and i != planner.end and not grid.is_wall(i):
+            grid.set(i, CLOSED)
+    for i in result.path[1:-1]:
+        grid.set(i, PATH)
+    print(f"LPA*: path length {max(len(result.path) - 1, 0)}, "
+          f"{result.nodes_expanded} nodes repaired in {result.elapsed * 1000:.2f} ms")
+    return result
+
+def wall_changed(grid, i, index, planner):
+    # Keep the HPA* index and the incremental planner in step with an edit
+    if index is not None:
+        index.update(i)
+    if planner is not None:
+        planner.update(i)
+        replan(grid, planner)
 
 
 # Main loop
-def main(win, width):
-    grid = make_grid(ROWS, width)
+def load_grid(path):
+    # Returns the saved grid with its start and end cells (None if unset)
+    grid, _ = mazefile.load(path, kind=mazefile.KIND_CELLS)
+    grid.clear_search()
+    starts = (grid.state == START).nonzero()[0]
+    ends = (grid.state == END).nonzero()[0]
+    start = int(starts[0]) if len(starts) else None
+    end = int(ends[0]) if len(ends) else None
+    return grid, start, end
+
+def main(rows=ROWS, cols=None, width=WIDTH, density=0, seed=None, algorithm="astar"):
+    pygame.init()
+    win = pygame.display.set_mode((width, width))
+    pygame.display.set_caption(f"Pathfinding Visualizer - SPACE: {algorithm}, J: Jump Point Search, "
+                               f"H: HPA*, I: incremental, S/L: save/load, C: clear, wheel: zoom")
+
+    grid = make_grid(rows, cols, density, seed)
+    renderer = make_renderer(win, grid)
 
     start = None
     end = None
+    # HPA* cluster index, built on first use and kept up to date as walls
+    # are painted and erased
+    index = None
+    # Incremental (LPA*) planner while that mode is on (I key)
+    planner = None
 
     run = True
     while run:
-        draw(win, grid, ROWS, width)
+        draw(renderer, grid)
 
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 run = False
 
+            if renderer.view.handle(event):
+                with profiler.section("draw"):
+                    renderer.redraw_static()
+
             if pygame.mouse.get_pressed()[0]:  # Left click
                 pos = pygame.mouse.get_pos()
-                row, col = get_clicked_pos(pos, ROWS, width)
-                node = grid[row][col]
-                if not start and node != end:
-                    start = node
-                    start.make_start()
-                elif not end and node != start:
-                    end = node
-                    end.make_end()
-                elif node != end and node != start:
-                    node.make_wall()
+                row, col = get_clicked_pos(pos, renderer.view)
+                if not grid.in_bounds(row, col):
+                    continue
+                i = grid.index(row, col)
+                was_wall = grid.is_wall(i)
+                if start is None and i != end:
+                    start = i
+                    grid.set(start, START)
+                    if was_wall:
+                        wall_changed(grid, i, index, planner)
+                elif end is None and i != start:
+                    end = i
+                    grid.set(end, END)
+                    if was_wall:
+                        wall_changed(grid, i, index, planner)
+                elif i != end and i != start and not was_wall:
+                    grid.set(i, WALL)
+                    wall_changed(grid, i, index, planner)
 
             elif pygame.mouse.get_pressed()[2]:  # Right click
                 pos = pygame.mouse.get_pos()
-                row, col = get_clicked_pos(pos, ROWS, width)
-                node = grid[row][col]
-                node.reset()
-                if node == start:
+                row, col = get_clicked_pos(pos, renderer.view)
+                if not grid.in_bounds(row, col):
+                    continue
+                i = grid.index(row, col)
+                was_wall = grid.is_wall(i)
+                grid.set(i, EMPTY)
+                if i == start or i == end:
+                    # The planner is tied to its start and end
+                    planner = None
+                if was_wall:
+                    wall_changed(grid, i, index, planner)
+                if i == start:
                     start = None
-                elif node == end:
+                elif i == end:
                     end = None
 
             if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_SPACE and start and end:
-                    a_star(lambda: draw(win, grid, ROWS, width), grid, start, end)
+                if event.key == pygame.K_SPACE and start is not None and end is not None:
+                    grid.clear_search()
+                    search(lambda: draw(renderer, grid), grid, start, end, solver.ALGORITHMS[algorithm])
+
+                if event.key == pygame.K_j and start is not None and end is not None:
+                    grid.clear_search()
+                    jump_point_search(lambda: draw(renderer, grid), grid, start, end)
+
+                if event.key == pygame.K_h and start is not None and end is not None:
+                    grid.clear_search()
+                    if index is None:
+                        index = hpa.ClusterIndex(grid)
+                    hpa_star(lambda: draw(renderer, grid), grid, start, end, index)
+
+                if event.key == pygame.K_i:
+                    grid.clear_search()
+                    if planner is not None:
+                        planner = None
+                    elif start is not None and end is not None:
+                        planner = incremental.LPAStar(grid, start, end)
+                        replan(grid, planner)
+
+                if event.key == pygame.K_s:
+                    mazefile.save(SAVE_FILE, grid)
+                    print(f"Saved grid to {SAVE_FILE}")
+
+                if event.key == pygame.K_l:
+                    try:
+                        grid, start, end = load_grid(SAVE_FILE)
+                    except (OSError, mazefile.MazeFileError) as e:
+                        print(f"Could not load {SAVE_FILE}: {e}")
+                    else:
+                        renderer = make_renderer(win, grid)
+                        index = None
+                        planner = None
 
                 if event.key == pygame.K_c:
                     start = None
                     end = None
-                    grid = make_grid(ROWS, width)
+                    grid = make_grid(grid.rows, grid.cols)
+                    renderer = make_renderer(win, grid)
+                    index = None
+                    planner = None
 
     pygame.quit()
 
 
 if __name__ == "__main__":
-    main(WIN, WIDTH)
+    parser = argparse.ArgumentParser(description="Pathfinding visualizer")
+    parser.add_argument("--size", type=int, default=ROWS, help="rows (and columns) of the grid")
+    parser.add_argument("--cols", type=int, default=None, help="columns if different from --size")
+    parser.add_argument("--width", type=int, default=WIDTH, help="window size in pixels")
+    parser.add_argument("--walls", type=float, default=0, metavar="DENSITY",
+                        help="start with this fraction of random walls")
+    parser.add_argument("--seed", type=int, default=None, help="seed for --walls")
+    parser.add_argument("--algorithm", choices=list(solver.ALGORITHMS), default="astar",
+                        help="search run by SPACE")
+    parser.add_argument("--profile", action="store_true", help="show frame timings on screen")
+    parser.add_argument("--trace", metavar="FILE", help="save frame timings as a Chrome trace")
+    args = parser.parse_args()
+    with profiler.profiling(args.profile or args.trace, args.trace, args.profile):
+        main(args.size, args.cols, args.width, args.walls, args.seed, args.algorithm)
@@ -0,0 +1,241 @@
+import json
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pygame
+
+import solver
+
+# Per-frame timings for the pygame apps, split into event handling, the
+# step (app logic and solving), drawing, the display flip and idle time
+# (frame-rate cap and waits). Event polls, flips and waits are timed by
+# hooking pygame, drawing by the section("draw") blocks in the drawing
+# code, and the rest of each frame counts as the step.
+# A frame ends at each pygame.display.flip() or update(). Shown as an
+# overlay in the top left corner and saved as a Chrome trace (open it at
+# chrome://tracing or ui.perfetto.dev). Every app takes --profile (overlay)
+# and --trace FILE, e.g.
+#   python maze_ai.py --size 1000 --profile --trace maze_ai.json
+
+SECTIONS = ["event", "step", "draw", "flip", "idle"]
+WINDOW = 120  # frames covered by the overlay's numbers
+REFRESH = 0.25  # seconds between overlay text updates
+TEXT = (255, 255, 255)
+BACKGROUND = (0, 0, 0)
+
+ACTIVE = None  # the Profiler of the running app, if any
+
+
+class Profiler:
+    def __init__(self, overlay=True, trace=False):
+        self.overlay = overlay
+        self.keep_trace = trace
+        self.frames = []  # [end, total, event, step, draw, flip, idle] in seconds
+        self.trace = []
+        self.searches = []  # (nodes expanded, seconds)
+        self.stack = []  # open sections: [name, start, time in nested sections]
+        self.current = dict.fromkeys(SECTIONS, 0.0)
+        self.frame_start = time.perf_counter()
+        self.saved = []
+        self.font = None
+        self.text = None
+        self.text_time = 0.0
+
+    def begin(self, name):
+        self.stack.append([name, time.perf_counter(), 0.0])
+
+    def end(self):
+        name, start, nested = self.stack.pop()
+        now = time.perf_counter()
+        spent = now - start
+        self.current[name] += spent - nested
+        if self.stack:
+            self.stack[-1][2] += spent
+        self._traced(name, start, now)
+        return now
+
+    def _traced(self, name, start, end):
+        if self.keep_trace:
+            self.trace.append({"name": name, "ph": "X", "pid": 0, "tid": 0,
+                               "ts": round(start * 1e6, 1), "dur": round((end - start) * 1e6, 1)})
+
+    def end_frame(self, now):
+        # Sections still open (a draw call that flips the display) are
+        # split at the frame boundary
+        inner = 0.0
+        for entry in reversed(self.stack):
+            name, start, nested = entry
+            spent = now - start
+            self.current[name] += spent - nested - inner
+            self._traced(name, start, now)
+            inner = spent
+            entry[1] = now
+            entry[2] = 0.0
+
+        current = self.current
+        total = now - self.frame_start
+        current["step"] += max(total - sum(current.values()), 0.0)
+        self.frames.append([now, total] + [current[name] for name in SECTIONS])
+        self._traced("frame", self.frame_start, now)
+        self.current = dict.fromkeys(SECTIONS, 0.0)
+        self.frame_start = now
+
+    # Hooks
+
+    def _timed(self, name, function):
+        def wrapper(*args, **kwargs):
+            self.begin(name)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.end()
+        return wrapper
+
+    def _clock(self, clock_type):
+        timed = self._timed
+
+        class Clock:
+            # Clock whose tick() (the frame-rate cap) counts as idle
+            def __init__(self):
+                self.clock = clock_type()
+                self.tick = timed("idle", self.clock.tick)
+                self.tick_busy_loop = timed("idle", self.clock.tick_busy_loop)
+
+            def __getattr__(self, name):
+                return getattr(self.clock, name)
+        return Clock
+
+    def _presented(self, present):
+        def wrapper(*args, **kwargs):
+            if self.overlay:
+                rect = self.draw_overlay()
+                if args and args[0] is not None and rect is not None:
+                    # Partial update: make sure the overlay goes out too
+                    args = (updated_rects(args[0]) + [rect],) + args[1:]
+            self.begin("flip")
+            try:
+                return present(*args, **kwargs)
+            finally:
+                self.end_frame(self.end())
+        return wrapper
+
+    def _replayed(self, replay):
+        def wrapper(result, *args, **kwargs):
+            self.searches.append((result.nodes_expanded, result.elapsed))
+            return replay(result, *args, **kwargs)
+        return wrapper
+
+    def _patch(self, obj, name, value):
+        self.saved.append((obj, name, getattr(obj, name)))
+        setattr(obj, name, value)
+
+    def install(self):
+        self._patch(pygame.event, "get", self._timed("event", pygame.event.get))
+        self._patch(pygame.time, "Clock", self._clock(pygame.time.Clock))
+        self._patch(pygame.time, "wait", self._timed("idle", pygame.time.wait))
+        self._patch(pygame.time, "delay", self._timed("idle", pygame.time.delay))
+        self._patch(pygame.display, "flip", self._presented(pygame.display.flip))
+        self._patch(pygame.display, "update", self._presented(pygame.display.update))
+        self._patch(solver, "replay", self._replayed(solver.replay))
+
+    def uninstall(self):
+        for obj, name, value in reversed(self.saved):
+            setattr(obj, name, value)
+        self.saved = []
+
+    # Numbers
+
+    def stats(self, frames=None):
+        frames = np.array(self.frames if frames is None else frames).reshape(-1, 2 + len(SECTIONS))
+        stats = {"frames": len(frames), "fps": 0.0, "p50_ms": 0.0, "p99_ms": 0.0}
+        stats.update({f"{name}_ms": 0.0 for name in SECTIONS})
+        if len(frames):
+            ms = frames[:, 1] * 1000
+            span = frames[-1, 0] - frames[0, 0] + frames[0, 1]
+            stats["fps"] = round(len(frames) / span, 1) if span > 0 else 0.0
+            stats["p50_ms"] = round(float(np.percentile(ms, 50)), 3)
+            stats["p99_ms"] = round(float(np.percentile(ms, 99)), 3)
+            for column, name in enumerate(SECTIONS, 2):
+                stats[f"{name}_ms"] = round(float(frames[:, column].mean() * 1000), 3)
+        nodes = sum(n for n, _ in self.searches)
+        seconds = sum(s for _, s in self.searches)
+        stats["searches"] = len(self.searches)
+        stats["nodes_per_s"] = round(nodes / seconds, 1) if seconds else 0.0
+        return stats
+
+    def draw_overlay(self):
+        surface = pygame.display.get_surface()
+        if surface is None or not pygame.font.get_init():
+            return None
+        self.begin("draw")
+        now = time.perf_counter()
+        if self.text is None or now - self.text_time > REFRESH:
+            self.text = self.render_text(self.stats(self.frames[-WINDOW:]))
+            self.text_time = now
+        rect = surface.blit(self.text, (0, 0))
+        self.end()
+        return rect
+
+    def render_text(self, stats):
+        if self.font is None:
+            self.font = pygame.font.Font(None, 18)
+        lines = [
+            f"{stats['fps']:.0f} FPS   frame p50 {stats['p50_ms']:.1f} ms   p99 {stats['p99_ms']:.1f} ms",
+            "   ".join(f"{name} {stats[name + '_ms']:.2f}" for name in SECTIONS) + " ms",
+        ]
+        if stats["searches"]:
+            lines.append(f"search {stats['nodes_per_s']:,.0f} nodes/s")
+        rendered = [self.font.render(line, True, TEXT) for line in lines]
+        height = self.font.get_linesize()
+        text = pygame.Surface((max(r.get_width() for r in rendered) + 8, height * len(lines) + 6))
+        text.fill(BACKGROUND)
+        for row, line in enumerate(rendered):
+            text.blit(line, (4, 3 + row * height))
+        return text
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump({"traceEvents": self.trace, "displayTimeUnit": "ms", "otherData": self.stats()}, f)
+
+
+def updated_rects(rects):
+    # pygame.display.update takes one rect or a list of them
+    if isinstance(rects, pygame.Rect) or (len(rects) == 4 and isinstance(rects[0], (int, float))):
+        return [rects]
+    return list(rects)
+
+
+@contextmanager
+def section(name):
+    # with profiler.section("draw"): ... times the block while profiling
+    profiler = ACTIVE
+    if profiler is None:
+        yield
+        return
+    profiler.begin(name)
+    try:
+        yield
+    finally:
+        profiler.end()
+
+
+@contextmanager
+def profiling(enabled=True, trace=None, overlay=True):
+    # Profile everything run inside the with block. The trace file is
+    # written on the way out, also when the app quits with sys.exit().
+    global ACTIVE
+    if not enabled or ACTIVE is not None:
+        yield ACTIVE
+        return
+    ACTIVE = Profiler(overlay, trace is not None)
+    ACTIVE.install()
+    try:
+        yield ACTIVE
+    finally:
+        profiler = ACTIVE
+        profiler.uninstall()
+        ACTIVE = None
+        if trace:
+            profiler.save(trace)
+            print(f"Trace of {len(profiler.frames)} frames saved to {trace}")
@@ -0,0 +1,384 @@
+import numpy as np
+import pygame
+
+from maze import TOP, RIGHT, BOTTOM, LEFT
+
+# Color used for "transparent" pixels on the static layer
+COLORKEY = (255, 0, 255)
+
+# Starting cell size in pixels for grids too big to fit the window, and the
+# largest zoom
+MIN_CELL_SIZE = 4
+MAX_CELL_SIZE = 64
+
+# Below this many pixels per cell maze walls can no longer be drawn one by
+# one, so mazes are drawn from a MazeMipmap instead
+LOD_CELL_SIZE = 4
+
+
+class Viewport:
+    # The part of a cells_x by cells_y grid of screen cells shown in a
+    # width x height window. (x, y) is the top-left visible cell. Grids that
+    # fit are shown whole; bigger ones are shown at MIN_CELL_SIZE and can be
+    # panned and zoomed instead of shrinking cells to nothing.
+    #
+    # The zoom is cell_size pixels per cell. With lod=True it can go further
+    # out, to one pixel per shrink x shrink cells, until the whole grid fits
+    # (the caller then has to draw from a mipmap).
+    def __init__(self, cells_x, cells_y, width, height, cell_size=None, min_size=1, lod=False):
+        self.cells_x = cells_x
+        self.cells_y = cells_y
+        self.width = width
+        self.height = height
+        fit = min(width // cells_x, height // cells_y)
+        if lod and fit < 1:
+            shrink = 1
+            while -(-cells_x // shrink) > width or -(-cells_y // shrink) > height:
+                shrink *= 2
+            self.min_zoom = (1, shrink)
+        elif lod:
+            self.min_zoom = (fit, 1)
+        else:
+            self.min_zoom = (max(fit, min_size), 1)
+        self.max_size = max(MAX_CELL_SIZE, self.min_zoom[0])
+        self.cell_size = cell_size or max(fit, MIN_CELL_SIZE)
+        self.shrink = 1
+        self.x = 0
+        self.y = 0
+
+    def scale(self):
+        # Pixels per cell (below 1 when zoomed out past one pixel per cell)
+        return self.cell_size / self.shrink
+
+    def span(self):
+        # Whole cells that fit across and down the window
+        return (self.width * self.shrink // self.cell_size,
+                self.height * self.shrink // self.cell_size)
+
+    def visible(self):
+        # Cell ranges with anything on screen: x0, x1, y0, y1
+        size = self.cell_size
+        x1 = min(self.x - (-self.width * self.shrink // size), self.cells_x)
+        y1 = min(self.y - (-self.height * self.shrink // size), self.cells_y)
+        return self.x, x1, self.y, y1
+
+    def clamp(self):
+        span_x, span_y = self.span()
+        self.x = max(0, min(self.x, self.cells_x - span_x))
+        self.y = max(0, min(self.y, self.cells_y - span_y))
+
+    def pan(self, dx, dy):
+        # Returns True if the view moved
+        before = (self.x, self.y)
+        self.x += dx
+        self.y += dy
+        self.clamp()
+        return (self.x, self.y) != before
+
+    def zoom(self, steps, anchor=(0, 0)):
+        # Double (steps > 0) or halve the zoom, keeping the cell under the
+        # anchor pixel where it is
+        old = self.scale()
+        size, shrink = self.cell_size, self.shrink
+        for _ in range(abs(steps)):
+            if steps > 0 and shrink > 1:
+                shrink //= 2
+            elif steps > 0:
+                size *= 2
+            elif size > 1:
+                size //= 2
+            else:
+                shrink *= 2
+        low_size, low_shrink = self.min_zoom
+        if size / shrink < low_size / low_shrink:
+            size, shrink = self.min_zoom
+        size = min(size, self.max_size)
+        if (size, shrink) == (self.cell_size, self.shrink):
+            return False
+
+        ax, ay = anchor
+        cx = self.x + ax / old
+        cy = self.y + ay / old
+        self.cell_size = size
+        self.shrink = shrink
+        new = self.scale()
+        self.x = int(cx - ax / new)
+        self.y = int(cy - ay / new)
+        self.clamp()
+        return True
+
+    def follow(self, x, y):
+        # Re-center on cell (x, y) once it leaves the window
+        span_x, span_y = self.span()
+        if self.x <= x < self.x + span_x and self.y <= y < self.y + span_y:
+            return False
+        self.x = x - span_x // 2
+        self.y = y - span_y // 2
+        self.clamp()
+        return True
+
+    def handle(self, event, pan_keys=True):
+        # Mouse wheel and +/- zoom, arrow keys pan. Returns True if the
+        # view changed and the window needs redrawing.
+        if event.type == pygame.MOUSEWHEEL:
+            return self.zoom(1 if event.y > 0 else -1, pygame.mouse.get_pos())
+        if event.type != pygame.KEYDOWN:
+            return False
+        center = (self.width // 2, self.height // 2)
+        if event.key in (pygame.K_EQUALS, pygame.K_PLUS, pygame.K_KP_PLUS):
+            return self.zoom(1, center)
+        if event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+            return self.zoom(-1, center)
+        if pan_keys:
+            span_x, span_y = self.span()
+            step_x = max(1, span_x // 4)
+            step_y = max(1, span_y // 4)
+            moves = {
+                pygame.K_LEFT: (-step_x, 0),
+                pygame.K_RIGHT: (step_x, 0),
+                pygame.K_UP: (0, -step_y),
+                pygame.K_DOWN: (0, step_y),
+            }
+            if event.key in moves:
+                return self.pan(*moves[event.key])
+        return False
+
+    def cell_at(self, pos):
+        # Screen cell under a pixel position (may be off the grid)
+        return (self.x + pos[0] * self.shrink // self.cell_size,
+                self.y + pos[1] * self.shrink // self.cell_size)
+
+    def rect(self, x, y):
+        size = self.cell_size
+        return pygame.Rect((x - self.x) * size, (y - self.y) * size, size, size)
+
+
+class CellRenderer:
+    # Draws a grid of colored cells incrementally. Walls and grid lines are
+    # drawn once onto an off-screen layer; each frame only cells whose color
+    # changed are repainted (with the static layer blitted back on top) and
+    # only their rects are sent to pygame.display.update. Only the cells in
+    # the viewport are drawn.
+    def __init__(self, win, rows, cols, background, transpose=False, view=None):
+        self.win = win
+        self.rows = rows
+        self.cols = cols
+        self.background = background
+        # transpose=True puts rows along x (as pathfinding_vizualizer does)
+        self.transpose = transpose
+        if view is None:
+            cells_x, cells_y = (rows, cols) if transpose else (cols, rows)
+            view = Viewport(cells_x, cells_y, *win.get_size())
+        self.view = view
+
+        self.static = pygame.Surface(win.get_size())
+        self.static.set_colorkey(COLORKEY)
+        # draw_static(surface, view) paints walls or grid lines for the
+        # visible cells; it is called again whenever the view changes
+        self.draw_static = None
+
+        self.colors = [None] * (rows * cols)
+        self.states = np.full(rows * cols, -1, dtype=np.int16)
+        self.dirty = set()
+        self.redraw_static()
+
+    def screen_cell(self, i):
+        row, col = divmod(i, self.cols)
+        return (row, col) if self.transpose else (col, row)
+
+    def grid_cell(self, x, y):
+        # Inverse of screen_cell
+        return x * self.cols + y if self.transpose else y * self.cols + x
+
+    def cell_rect(self, i):
+        return self.view.rect(*self.screen_cell(i))
+
+    def redraw_static(self):
+        # Repaint the static layer for the current view and force a full
+        # redraw on the next flush
+        self.static.fill(COLORKEY)
+        if self.draw_static is not None:
+            self.draw_static(self.static, self.view)
+        self.invalidate()
+
+    def set(self, i, color):
+        if self.colors[i] != color:
+            self.colors[i] = color
+            self.dirty.add(i)
+
+    def sync(self, states, palette):
+        # Mark the cells whose entry in a state array changed since the
+        # last sync, coloring them from palette[state]
+        changed = np.flatnonzero(self.states != states)
+        for i in changed.tolist():
+            self.set(i, palette[states[i]])
+        self.states[changed] = states[changed]
+
+    def invalidate(self):
+        # Force a full repaint on the next flush (e.g. after the static
+        # layer has been redrawn)
+        self.full_redraw = True
+
+    def flush(self):
+        win = self.win
+        static = self.static
+        view = self.view
+        x0, x1, y0, y1 = view.visible()
+
+        if self.full_redraw:
+            win.fill(self.background)
+            colors = self.colors
+            for y in range(y0, y1):
+                for x in range(x0, x1):
+                    color = colors[self.grid_cell(x, y)]
+                    if color is not None:
+                        win.fill(color, view.rect(x, y))
+            win.blit(static, (0, 0))
+            pygame.display.update()
+            self.full_redraw = False
+            self.dirty.clear()
+            return
+
+        if not self.dirty:
+            return
+
+        rects = []
+        for i in self.dirty:
+            x, y = self.screen_cell(i)
+            if not (x0 <= x < x1 and y0 <= y < y1):
+                continue
+            rect = view.rect(x, y)
+            win.fill(self.colors[i], rect)
+            win.blit(static, rect, rect)
+            rects.append(rect)
+        self.dirty.clear()
+
+        # One big update is cheaper than thousands of small ones
+        if len(rects) > (x1 - x0) * (y1 - y0) // 4:
+            pygame.display.update()
+        elif rects:
+            pygame.display.update(rects)
+
+
+def draw_walls(surface, bits, cell_size, color, width=1, y=0):
+    # Draw the walls of a (rows, cols) array of maze wall bits in one go:
+    # the wall pixels are built as a NumPy mask and written through
+    # pygame.surfarray, matching what pygame.draw.line would draw for each
+    # wall of each cell. y is the pixel row where the first maze row starts.
+    bits = np.asarray(bits, dtype=np.uint8)
+    rows, cols = bits.shape
+    size = cell_size
+    # Lines of width w cover offsets -(w - 1) // 2 ... w // 2 around their
+    # position; pad shifts the negative ones inside the mask
+    offsets = range(-((width - 1) // 2), width // 2 + 1)
+    pad = width
+    mask = np.zeros((pad + y + rows * size + width + 1, pad + cols * size + width + 1), dtype=bool)
+
+    def runs(present):
+        # Each wall covers size + 1 pixels (both end points) along its line
+        line = np.zeros((present.shape[0], present.shape[1] * size + 1), dtype=bool)
+        line[:, :-1] = np.repeat(present, size, axis=1)
+        line[:, size::size] |= present
+        return line
+
+    across = slice(pad, pad + cols * size + 1)
+    for bit, shift in ((TOP, 0), (BOTTOM, size)):
+        line = runs(bits & bit != 0)
+        for offset in offsets:
+            mask[pad + y + np.arange(rows) * size + shift + offset, across] |= line
+    down = slice(pad + y, pad + y + rows * size + 1)
+    for bit, shift in ((LEFT, 0), (RIGHT, size)):
+        line = runs((bits & bit != 0).T)
+        for offset in offsets:
+            mask[down, pad + np.arange(cols) * size + shift + offset] |= line.T
+
+    surface_w, surface_h = surface.get_size()
+    mask = mask[pad:pad + surface_h, pad:pad + surface_w]
+    pixels = pygame.surfarray.pixels3d(surface)
+    pixels[:mask.shape[1], :mask.shape[0]][mask.T] = color[:3]
+    del pixels
+
+
+class MazeMipmap:
+    # Far-zoom picture of a maze. Level 0 is the maze as a grey-scale image
+    # with two pixels per cell (the cell, and the wall or opening to its
+    # right and below) plus the outer wall; every further level averages
+    # 2x2 blocks of the one before. render() samples the level closest to
+    # the zoom with NumPy indexing and writes it through pygame.surfarray,
+    # so a frame costs the same for a 40x40 maze as for a 4000x4000 one.
+    def __init__(self, maze, smallest=64):
+        rows, cols = maze.rows, maze.cols
+        bits = maze.walls.reshape(rows, cols)
+        image = np.zeros((2 * rows + 1, 2 * cols + 1), dtype=np.uint8)
+        image[1::2, 1::2] = 255
+        image[1::2, 2:-1:2][bits[:, :-1] & RIGHT == 0] = 255
+        image[2:-1:2, 1::2][bits[:-1, :] & BOTTOM == 0] = 255
+        self.rows = rows
+        self.cols = cols
+        self.levels = [image]
+        while max(image.shape) > smallest:
+            h, w = image.shape
+            # Pad odd sizes with wall pixels, then average 2x2 blocks
+            padded = np.zeros((h + h % 2, w + w % 2), dtype=np.uint16)
+            padded[:h, :w] = image
+            blocks = padded.reshape(padded.shape[0] // 2, 2, padded.shape[1] // 2, 2)
+            image = (blocks.sum(axis=(1, 3)) // 4).astype(np.uint8)
+            self.levels.append(image)
+
+    def render(self, surface, view, marks=None, overlay=None, points=(), background=(200, 200, 200)):
+        # Draw the view into surface. overlay maps mark states (values in
+        # marks.state) to colors; points is a list of (cells, color) drawn
+        # on top at one pixel or more each, so a one-cell-wide path stays
+        # visible however far out the view is.
+        #
+        # The frame is built as an 8-bit palette image: codes 0-127 are
+        # grey levels, 128 and up the overlay and point colors, 255 the
+        # background. pygame then does the palette lookup in C.
+        width, height = surface.get_size()
+        scale = view.scale()
+        # Level whose pixels are closest to (but not bigger than) a screen pixel
+        per_pixel = 2 / scale
+        level = 0
+        while level + 1 < len(self.levels) and 2 ** (level + 1) <= per_pixel:
+            level += 1
+        image = self.levels[level]
+
+        # Cell (fractional) at the center of every screen column and row
+        cell_x = view.x + (np.arange(width) + 0.5) / scale
+        cell_y = view.y + (np.arange(height) + 0.5) / scale
+        ix = np.minimum((cell_x * 2 / 2 ** level).astype(np.intp), image.shape[1] - 1)
+        iy = np.minimum((cell_y * 2 / 2 ** level).astype(np.intp), image.shape[0] - 1)
+        frame = np.take(np.take(image, iy, axis=0), ix, axis=1) >> 1
+
+        palette = [(2 * k, 2 * k, 2 * k) for k in range(128)]
+        if marks is not None and overlay:
+            cx = np.minimum(cell_x.astype(np.intp), self.cols - 1)
+            cy = np.minimum(cell_y.astype(np.intp), self.rows - 1)
+            states = np.take(np.take(marks.state.reshape(self.rows, self.cols), cy, axis=0), cx, axis=1)
+            for state, color in overlay.items():
+                frame[states == state] = len(palette)
+                palette.append(color)
+        frame[cell_y >= self.rows, :] = 255
+        frame[:, cell_x >= self.cols] = 255
+
+        size = max(1, int(scale))
+        for cells, color in points:
+            cells = np.asarray(cells, dtype=np.intp)
+            code = len(palette)
+            palette.append(color)
+            if not len(cells):
+                continue
+            row, col = np.divmod(cells, self.cols)
+            px = ((col - view.x) * scale).astype(np.intp)
+            py = ((row - view.y) * scale).astype(np.intp)
+            keep = (px >= 0) & (px < width) & (py >= 0) & (py < height)
+            px, py = px[keep], py[keep]
+            for dy in range(size):
+                for dx in range(size):
+                    frame[np.minimum(py + dy, height - 1), np.minimum(px + dx, width - 1)] = code
+
+        palette += [background] * (256 - len(palette))
+        picture = pygame.Surface((width, height), depth=8)
+        picture.set_palette(palette)
+        pygame.surfarray.blit_array(picture, frame.T)
+        surface.blit(picture, (0, 0))
@@ -0,0 +1,150 @@
+import argparse
+import gzip
+import json
+import random
+import sys
+import time
+
+import pygame
+
+import headless
+
+# Record a session of one of the pygame apps (its arguments, seed and every
+# input event with the tick and time it arrived at) and replay it later
+# without a display and without frame-rate caps. A replay feeds each event
+# to the app at the same tick (event poll), so searches and frames come out
+# exactly the same; searches are checked against the recording. Run from
+# this folder, e.g.
+#   python session.py record maze_game play.session -- --size 20
+#   python session.py replay play.session
+#   python session.py replay play.session --window --realtime   (watch it)
+
+VERSION = 1
+
+# Apps with a --seed flag; the car seeds from the global generators
+SEEDED = {"visualizer", "maze_ai", "maze_game"}
+
+# Event types worth recording and the attributes the apps read
+RECORDED = ["QUIT", "KEYDOWN", "KEYUP", "MOUSEBUTTONDOWN", "MOUSEBUTTONUP", "MOUSEMOTION", "MOUSEWHEEL"]
+FIELDS = ["key", "button", "pos", "buttons", "x", "y"]
+
+
+class Recording:
+    # Passes pygame's real events through to the app and logs them as
+    # [tick, ms since the first poll, type, attributes]
+    def __init__(self):
+        self.poll = pygame.event.get
+        self.get_pressed = pygame.mouse.get_pressed
+        self.get_pos = pygame.mouse.get_pos
+        self.types = {getattr(pygame, name): name for name in RECORDED}
+        self.tick = 0
+        self.delivered = 0
+        self.events = []
+        self.begin = None
+
+    def get(self, *args, **kwargs):
+        events = self.poll(*args, **kwargs)
+        now = time.perf_counter()
+        if self.begin is None:
+            self.begin = now
+        self.tick += 1
+        for event in events:
+            kind = self.types.get(event.type)
+            if kind is None:
+                continue
+            attrs = {name: getattr(event, name) for name in FIELDS if hasattr(event, name)}
+            self.events.append([self.tick, round((now - self.begin) * 1000), kind, attrs])
+        self.delivered += len(events)
+        return events
+
+
+def with_seed(app, argv, seed):
+    # Pass the session seed on unless the command line already has one
+    argv = list(argv)
+    if app in SEEDED and not any(arg.startswith("--seed") for arg in argv):
+        argv += ["--seed", str(seed)]
+    return argv
+
+
+def save(path, session):
+    with gzip.open(path, "wt") as f:
+        json.dump(session, f, separators=(",", ":"))
+
+
+def load(path):
+    with gzip.open(path, "rt") as f:
+        session = json.load(f)
+    if session.get("version") != VERSION:
+        raise ValueError(f"{path}: unsupported session version {session.get('version')}")
+    return session
+
+
+def record(app, path, argv=(), seed=None):
+    seed = random.randrange(2 ** 31) if seed is None else seed
+    argv = with_seed(app, argv, seed)
+    recording = Recording()
+    # Recorded at the app's own pace, in a real window
+    report = headless.run(app, argv, realtime=True, seed=seed, source=recording, window=True)
+    session = {
+        "version": VERSION,
+        "app": app,
+        "args": argv,
+        "seed": seed,
+        "ticks": recording.tick,
+        "duration_s": report["wall_s"],
+        "searches": report["searches"],
+        "events": recording.events,
+    }
+    save(path, session)
+    return session, report
+
+
+def replay(session, realtime=False, window=False):
+    script = [[tick, kind, attrs] for tick, _, kind, attrs in session["events"]]
+    report = headless.run(session["app"], session["args"], script, session["ticks"],
+                          realtime, session["seed"], window=window)
+    report["speedup"] = round(session["duration_s"] / report["wall_s"], 1)
+    report["matches"] = report["searches"] == session["searches"]
+    return report
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    app_argv = []
+    if "--" in argv:
+        split = argv.index("--")
+        argv, app_argv = argv[:split], argv[split + 1:]
+
+    parser = argparse.ArgumentParser(description="Record and replay sessions of the pygame apps")
+    commands = parser.add_subparsers(dest="command", required=True)
+    recorder = commands.add_parser("record", help="play an app and save the session")
+    recorder.add_argument("app", choices=list(headless.APPS))
+    recorder.add_argument("file")
+    recorder.add_argument("--seed", type=int, default=None, help="session seed (default: random)")
+    player = commands.add_parser("replay", help="replay a saved session")
+    player.add_argument("file")
+    player.add_argument("--realtime", action="store_true", help="keep the apps' frame-rate caps and waits")
+    player.add_argument("--window", action="store_true", help="show the replay in a window")
+    player.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        session, _ = record(args.app, args.file, app_argv, args.seed)
+        print(f"Recorded {len(session['events'])} events over {session['ticks']} ticks "
+              f"({session['duration_s']:.1f} s, seed {session['seed']}) to {args.file}")
+        return
+
+    session = load(args.file)
+    report = replay(session, args.realtime, args.window)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        headless.print_report(report)
+        print(f"Replayed a {session['duration_s']:.1f} s session in {report['wall_s']:.2f} s "
+              f"(x{report['speedup']:.1f})")
+    if not report["matches"]:
+        raise SystemExit("searches differ from the recording")
+
+
+if __name__ == "__main__":
+    main()
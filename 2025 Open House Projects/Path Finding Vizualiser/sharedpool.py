@@ -0,0 +1,62 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# A process pool whose workers all see one NumPy array in a shared-memory
+# block, so tasks only pickle small arguments and results. Used by farm.py
+# (the walls of every maze) and by the car's evolution.py (the sensor
+# field). Workers read the array with shared().
+
+_shared = None  # (block, array), set in each worker by _attach
+
+
+def _attach(name, shape, dtype):
+    global _shared
+    # Pool workers share the parent's resource tracker, and the parent
+    # unlinks the block when it is done
+    shm = shared_memory.SharedMemory(name=name)
+    _shared = (shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf))
+
+
+def shared():
+    # The pool's array, in a worker
+    return _shared[1]
+
+
+def _warm_up(_):
+    return os.getpid()
+
+
+class SharedPool:
+    def __init__(self, workers, shape, dtype, data=None):
+        # A zeroed array of this shape and dtype, or a copy of data
+        dtype = np.dtype(dtype)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * dtype.itemsize, 1))
+        try:
+            if data is not None:
+                np.ndarray(shape, dtype=dtype, buffer=self.shm.buf)[:] = data
+            self.pool = ProcessPoolExecutor(workers, initializer=_attach,
+                                            initargs=(self.shm.name, shape, dtype))
+            # Start every worker now so process start-up and imports are
+            # not counted against the first tasks
+            list(self.pool.map(_warm_up, range(workers)))
+        except BaseException:
+            self.shm.close()
+            self.shm.unlink()
+            raise
+
+    def map(self, function, *iterables):
+        return self.pool.map(function, *iterables)
+
+    def close(self):
+        self.pool.shutdown()
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
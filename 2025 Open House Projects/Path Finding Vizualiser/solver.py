@@ -0,0 +1,499 @@
+import heapq
+import threading
+import time
+from collections import deque
+
+from grid import WALL
+
+# Headless search code shared by the visualizers. Nothing in here imports
+# pygame: a graph is any object with neighbors(i), pos(i) and len() over
+# flat integer cell indices, and the result records everything a
+# visualizer needs to replay the search afterwards.
+
+
+class SearchResult:
+    def __init__(self, found, path, expanded, discovered, elapsed, aborted=False):
+        self.found = found
+        self.path = path  # cells from start to end (empty if not found)
+        self.expanded = expanded  # cells in the order they were expanded
+        self.discovered = discovered  # cells first opened by each expansion
+        self.elapsed = elapsed  # solve time in seconds
+        self.aborted = aborted  # gave up after hitting an expansion limit
+
+    @property
+    def nodes_expanded(self):
+        return len(self.expanded)
+
+    @property
+    def nodes_opened(self):
+        return sum(len(cells) for cells in self.discovered)
+
+    def stats(self):
+        return {
+            "found": self.found,
+            "path_length": max(len(self.path) - 1, 0),
+            "nodes_expanded": self.nodes_expanded,
+            "nodes_opened": self.nodes_opened,
+            "elapsed": self.elapsed,
+            "aborted": self.aborted,
+        }
+
+
+def manhattan(p1, p2):
+    return abs(p1[0] - p2[0]) + abs(p1[1] - p2[1])
+
+
+class Workspace:
+    # Per-cell search arrays indexed by flat cell id. They are allocated
+    # once per graph size and reused: an entry only counts when its stamp
+    # matches the current search id, so starting a search costs O(1)
+    # instead of O(cells).
+    def __init__(self, size):
+        self.size = size
+        self.g_score = [0] * size
+        self.came_from = [0] * size
+        self.seen = [0] * size  # stamp: g_score/came_from are valid
+        self.closed = [0] * size  # stamp: cell has been expanded
+        self.search_id = 0
+
+    def begin(self):
+        self.search_id += 1
+        return self.search_id
+
+
+# Each thread keeps the workspaces of the last graph size it searched; a
+# search on another size replaces them, so at most one size stays alive
+_local = threading.local()
+
+
+def get_workspace(size, slot=0):
+    # slot lets one search use several workspaces (bidirectional A*)
+    cached = getattr(_local, "workspaces", None)
+    if cached is None or cached[0] != size:
+        cached = _local.workspaces = (size, {})
+    workspaces = cached[1]
+    workspace = workspaces.get(slot)
+    if workspace is None:
+        workspace = workspaces[slot] = Workspace(size)
+    return workspace
+
+
+def free_workspaces():
+    # Drop this thread's workspaces (the next search allocates new ones)
+    _local.workspaces = None
+
+
+def reconstruct_path(came_from, start, current):
+    path = [current]
+    while current != start:
+        current = came_from[current]
+        path.append(current)
+    path.reverse()
+    return path
+
+
+def _best_first(graph, start, end, heuristic, use_g, use_h, landmarks=None):
+    # Shared heap search: A* (g + h), Dijkstra (g) and greedy best-first (h).
+    # landmarks, if given, is a list of (distances from landmark L, distance
+    # from L to end) for ALT on a row/col grid: h becomes the max of
+    # Manhattan and every |d(L, cell) - d(L, end)|, and ties on f go to the
+    # cell with the smaller h (the one nearer the goal).
+    start_time = time.perf_counter()
+    workspace = get_workspace(len(graph))
+    search_id = workspace.begin()
+    g_score = workspace.g_score
+    came_from = workspace.came_from
+    seen = workspace.seen
+    closed = workspace.closed
+    neighbors = graph.neighbors
+    push = heapq.heappush
+    pop = heapq.heappop
+
+    # Manhattan distance is inlined when the graph is a plain row/col grid
+    inline = heuristic is manhattan
+    cols = getattr(graph, "cols", None) if inline else None
+    if landmarks is not None and cols is None:
+        raise ValueError("landmarks need a row/col grid and the Manhattan heuristic")
+    end_pos = graph.pos(end)
+    end_row, end_col = end_pos
+
+    g_score[start] = 0
+    seen[start] = search_id
+    count = 0
+    # Heap of (f, count, cell), or (f, h, count, cell) with landmarks;
+    # stale entries are skipped via closed
+    open_set = [(0, 0, count, start) if landmarks is not None else (0, count, start)]
+    expanded = []
+    discovered = []
+
+    while open_set:
+        current = pop(open_set)[-1]
+        if closed[current] == search_id:
+            continue
+        closed[current] = search_id
+        expanded.append(current)
+        opened = []
+        discovered.append(opened)
+
+        if current == end:
+            path = reconstruct_path(came_from, start, end)
+            return SearchResult(True, path, expanded, discovered, time.perf_counter() - start_time)
+
+        temp_g_score = g_score[current] + 1
+        for neighbor in neighbors(current):
+            if closed[neighbor] == search_id:
+                continue
+
+            if seen[neighbor] != search_id:
+                seen[neighbor] = search_id
+                opened.append(neighbor)
+            elif temp_g_score >= g_score[neighbor]:
+                continue
+
+            came_from[neighbor] = current
+            g_score[neighbor] = temp_g_score
+            f_score = temp_g_score if use_g else 0
+            if use_h:
+                if cols is not None:
+                    row, col = divmod(neighbor, cols)
+                    h = abs(row - end_row) + abs(col - end_col)
+                    if landmarks is not None:
+                        for table, to_end in landmarks:
+                            d = table[neighbor] - to_end
+                            if d < 0:
+                                d = -d
+                            if d > h:
+                                h = d
+                    f_score += h
+                else:
+                    f_score += heuristic(graph.pos(neighbor), end_pos)
+            count += 1
+            if landmarks is not None:
+                push(open_set, (f_score, h, count, neighbor))
+            else:
+                push(open_set, (f_score, count, neighbor))
+
+    return SearchResult(False, [], expanded, discovered, time.perf_counter() - start_time)
+
+
+def a_star(graph, start, end, heuristic=manhattan, landmarks=None):
+    return _best_first(graph, start, end, heuristic, True, True, landmarks)
+
+
+def dijkstra(graph, start, end):
+    return _best_first(graph, start, end, manhattan, True, False)
+
+
+def greedy_best_first(graph, start, end, heuristic=manhattan):
+    # Fast but not guaranteed to find the shortest path
+    return _best_first(graph, start, end, heuristic, False, True)
+
+
+def bfs(graph, start, end):
+    start_time = time.perf_counter()
+    workspace = get_workspace(len(graph))
+    search_id = workspace.begin()
+    came_from = workspace.came_from
+    seen = workspace.seen
+    neighbors = graph.neighbors
+
+    seen[start] = search_id
+    queue = deque([start])
+    expanded = []
+    discovered = []
+
+    while queue:
+        current = queue.popleft()
+        expanded.append(current)
+        opened = []
+        discovered.append(opened)
+
+        if current == end:
+            path = reconstruct_path(came_from, start, end)
+            return SearchResult(True, path, expanded, discovered, time.perf_counter() - start_time)
+
+        for neighbor in neighbors(current):
+            if seen[neighbor] != search_id:
+                seen[neighbor] = search_id
+                came_from[neighbor] = current
+                opened.append(neighbor)
+                queue.append(neighbor)
+
+    return SearchResult(False, [], expanded, discovered, time.perf_counter() - start_time)
+
+
+def bidirectional_a_star(graph, start, end, heuristic=manhattan):
+    # Two A* searches, from start towards end and from end towards start
+    # (graphs here are undirected). Stops once the best meeting path is no
+    # longer than the smallest f on either frontier.
+    start_time = time.perf_counter()
+    size = len(graph)
+    neighbors = graph.neighbors
+    pos = graph.pos
+    expanded = []
+    discovered = []
+
+    if start == end:
+        return SearchResult(True, [start], [start], [[]], time.perf_counter() - start_time)
+
+    sides = []
+    for slot, source, target in ((0, start, end), (1, end, start)):
+        workspace = get_workspace(size, slot)
+        search_id = workspace.begin()
+        workspace.g_score[source] = 0
+        workspace.seen[source] = search_id
+        sides.append((workspace, search_id, [(0, 0, source)], pos(target)))
+
+    best = float("inf")
+    meet = None
+    count = 0
+
+    while sides[0][2] and sides[1][2]:
+        if best <= max(sides[0][2][0][0], sides[1][2][0][0]):
+            break
+
+        # Expand from whichever frontier is smaller
+        side = 0 if len(sides[0][2]) <= len(sides[1][2]) else 1
+        workspace, search_id, open_set, target_pos = sides[side]
+        other, other_id = sides[1 - side][0], sides[1 - side][1]
+
+        current = heapq.heappop(open_set)[2]
+        if workspace.closed[current] == search_id:
+            continue
+        workspace.closed[current] = search_id
+        expanded.append(current)
+        opened = []
+        discovered.append(opened)
+
+        temp_g_score = workspace.g_score[current] + 1
+        for neighbor in neighbors(current):
+            if workspace.closed[neighbor] == search_id:
+                continue
+            if workspace.seen[neighbor] != search_id:
+                workspace.seen[neighbor] = search_id
+                opened.append(neighbor)
+            elif temp_g_score >= workspace.g_score[neighbor]:
+                continue
+
+            workspace.came_from[neighbor] = current
+            workspace.g_score[neighbor] = temp_g_score
+            count += 1
+            heapq.heappush(open_set, (temp_g_score + heuristic(pos(neighbor), target_pos), count, neighbor))
+
+            if other.seen[neighbor] == other_id:
+                length = temp_g_score + other.g_score[neighbor]
+                if length < best:
+                    best = length
+                    meet = neighbor
+
+    if meet is None:
+        return SearchResult(False, [], expanded, discovered, time.perf_counter() - start_time)
+
+    path = reconstruct_path(sides[0][0].came_from, start, meet)
+    tail = reconstruct_path(sides[1][0].came_from, end, meet)
+    path.extend(reversed(tail[:-1]))
+    return SearchResult(True, path, expanded, discovered, time.perf_counter() - start_time)
+
+
+def jump_point_search(graph, start, end):
+    # Jump Point Search for 4-connected, uniform-cost cell grids (a Grid).
+    # Straight runs of open cells are skipped over and only "jump points"
+    # (cells with a forced neighbor, or the goal) are put on the heap.
+    # expanded/discovered hold jump points; path holds every cell.
+    start_time = time.perf_counter()
+    cells = graph.cells
+    rows, cols = graph.rows, graph.cols
+    workspace = get_workspace(len(graph))
+    search_id = workspace.begin()
+    g_score = workspace.g_score
+    came_from = workspace.came_from
+    seen = workspace.seen
+    closed = workspace.closed
+    end_row, end_col = divmod(end, cols)
+
+    def open_cell(row, col):
+        return 0 <= row < rows and 0 <= col < cols and cells[row * cols + col] != WALL
+
+    def jump_horizontal(row, col, dc):
+        # Walk along a row until the goal, a forced neighbor or a wall
+        while True:
+            col += dc
+            if not open_cell(row, col):
+                return None
+            if row == end_row and col == end_col:
+                return row, col
+            if (open_cell(row - 1, col) and not open_cell(row - 1, col - dc)) or \
+                    (open_cell(row + 1, col) and not open_cell(row + 1, col - dc)):
+                return row, col
+
+    def jump(row, col, dr, dc):
+        if dc:
+            return jump_horizontal(row, col, dc)
+        # Moving vertically: also stop where a horizontal scan finds something
+        while True:
+            row += dr
+            if not open_cell(row, col):
+                return None
+            if row == end_row and col == end_col:
+                return row, col
+            if (open_cell(row, col - 1) and not open_cell(row - dr, col - 1)) or \
+                    (open_cell(row, col + 1) and not open_cell(row - dr, col + 1)):
+                return row, col
+            if jump_horizontal(row, col, 1) or jump_horizontal(row, col, -1):
+                return row, col
+
+    def directions(current):
+        row, col = divmod(current, cols)
+        if current == start:
+            return ((-1, 0), (0, 1), (1, 0), (0, -1))
+        prow, pcol = divmod(came_from[current], cols)
+        dr = (row > prow) - (row < prow)
+        dc = (col > pcol) - (col < pcol)
+        if dc:
+            return ((-1, 0), (1, 0), (0, dc))
+        return ((0, -1), (0, 1), (dr, 0))
+
+    g_score[start] = 0
+    seen[start] = search_id
+    count = 0
+    open_set = [(0, count, start)]
+    expanded = []
+    discovered = []
+
+    while open_set:
+        current = heapq.heappop(open_set)[2]
+        if closed[current] == search_id:
+            continue
+        closed[current] = search_id
+        expanded.append(current)
+        opened = []
+        discovered.append(opened)
+
+        if current == end:
+            jump_points = reconstruct_path(came_from, start, end)
+            path = [start]
+            for a, b in zip(jump_points, jump_points[1:]):
+                step = (cols if b > a else -cols) if abs(b - a) >= cols else (1 if b > a else -1)
+                path.extend(range(a + step, b + step, step))
+            return SearchResult(True, path, expanded, discovered, time.perf_counter() - start_time)
+
+        row, col = divmod(current, cols)
+        for dr, dc in directions(current):
+            found = jump(row, col, dr, dc)
+            if found is None:
+                continue
+            jrow, jcol = found
+            neighbor = jrow * cols + jcol
+            if closed[neighbor] == search_id:
+                continue
+            temp_g_score = g_score[current] + abs(jrow - row) + abs(jcol - col)
+            if seen[neighbor] != search_id:
+                seen[neighbor] = search_id
+                opened.append(neighbor)
+            elif temp_g_score >= g_score[neighbor]:
+                continue
+
+            came_from[neighbor] = current
+            g_score[neighbor] = temp_g_score
+            count += 1
+            f_score = temp_g_score + abs(jrow - end_row) + abs(jcol - end_col)
+            heapq.heappush(open_set, (f_score, count, neighbor))
+
+    return SearchResult(False, [], expanded, discovered, time.perf_counter() - start_time)
+
+
+def ida_star(graph, start, end, heuristic=manhattan, max_expansions=2_000_000):
+    # Iterative-deepening A*: depth-first searches with a growing f bound.
+    # Uses memory proportional to the path length only, but re-expands
+    # cells on every iteration, so it gives up after max_expansions.
+    start_time = time.perf_counter()
+    neighbors = graph.neighbors
+    pos = graph.pos
+    end_pos = pos(end)
+    expanded = []
+    discovered = []
+    no_cells = ()
+
+    bound = heuristic(pos(start), end_pos)
+    while True:
+        next_bound = float("inf")
+        path = [start]
+        on_path = {start}
+        stack = [iter(neighbors(start))]
+        expanded.append(start)
+        discovered.append(no_cells)
+        if start == end:
+            return SearchResult(True, path, expanded, discovered, time.perf_counter() - start_time)
+
+        while stack:
+            g = len(path)
+            for neighbor in stack[-1]:
+                if neighbor in on_path:
+                    continue
+                f_score = g + heuristic(pos(neighbor), end_pos)
+                if f_score > bound:
+                    next_bound = min(next_bound, f_score)
+                    continue
+
+                path.append(neighbor)
+                on_path.add(neighbor)
+                expanded.append(neighbor)
+                discovered.append(no_cells)
+                if neighbor == end:
+                    return SearchResult(True, path, expanded, discovered, time.perf_counter() - start_time)
+                if len(expanded) >= max_expansions:
+                    return SearchResult(False, [], expanded, discovered, time.perf_counter() - start_time, aborted=True)
+                stack.append(iter(neighbors(neighbor)))
+                break
+            else:
+                stack.pop()
+                on_path.discard(path.pop())
+
+        if next_bound == float("inf"):
+            return SearchResult(False, [], expanded, discovered, time.perf_counter() - start_time)
+        bound = next_bound
+
+
+# Every search algorithm, by the name used on the command line
+ALGORITHMS = {
+    "astar": a_star,
+    "bfs": bfs,
+    "dijkstra": dijkstra,
+    "greedy": greedy_best_first,
+    "bidirectional": bidirectional_a_star,
+    "jps": jump_point_search,
+    "idastar": ida_star,
+}
+
+# Algorithms that only work on cell grids (Grid), not on wall mazes
+CELL_GRID_ONLY = {"jps"}
+
+
+def supports(name, graph):
+    return name not in CELL_GRID_ONLY or hasattr(graph, "cells")
+
+
+def solve(name, graph, start, end, **options):
+    if not supports(name, graph):
+        raise ValueError(f"{name} only works on cell grids")
+    return ALGORITHMS[name](graph, start, end, **options)
+
+
+def replay(result, on_open, on_close, on_path, draw, speed=1):
+    # Step through a finished search calling the callbacks in the original
+    # order, drawing once every `speed` steps
+    speed = max(1, int(speed))
+    for step, current in enumerate(result.expanded):
+        for cell in result.discovered[step]:
+            on_open(cell)
+        on_close(current)
+        if (step + 1) % speed == 0:
+            draw()
+
+    # Walk back from the end like the old reconstruct_path did
+    for step, cell in enumerate(reversed(result.path)):
+        on_path(cell)
+        if (step + 1) % speed == 0:
+            draw()
+
+    draw()
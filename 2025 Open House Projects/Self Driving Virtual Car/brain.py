@@ -8,6 +8,14 @@ class NeuralNetwork:
         self.w2 = np.random.randn(output_size, hidden_size)
         self.b2 = np.random.randn(output_size, 1)
 
+    @classmethod
+    def from_weights(cls, w1, b1, w2, b2):
+        # Network with these weights; unlike NeuralNetwork(...) this draws
+        # nothing from np.random, so copying brains leaves seeded runs alone
+        net = cls.__new__(cls)
+        net.w1, net.b1, net.w2, net.b2 = w1, b1, w2, b2
+        return net
+
     def activate(self, x):
         # Sigmoid activation
         return 1 / (1 + np.exp(-x))
@@ -34,9 +42,76 @@ class NeuralNetwork:
 
     def clone(self):
         # Make a copy of the brain
-        clone = NeuralNetwork(self.w1.shape[1], self.w1.shape[0], self.w2.shape[0])
-        clone.w1 = np.copy(self.w1)
-        clone.b1 = np.copy(self.b1)
-        clone.w2 = np.copy(self.w2)
-        clone.b2 = np.copy(self.b2)
-        return clone
+        return NeuralNetwork.from_weights(np.copy(self.w1), np.copy(self.b1),
+                                          np.copy(self.w2), np.copy(self.b2))
+
+
+class PopulationBrain:
+    # The NeuralNetworks of a whole population stacked into 3D arrays (one
+    # matrix per car along the first axis), so every car's decision for a
+    # tick comes out of one batched matmul instead of a forward() per car.
+    # Same layer shapes and results as NeuralNetwork.
+    def __init__(self, size, input_size, hidden_size, output_size):
+        self.w1 = np.random.randn(size, hidden_size, input_size)
+        self.b1 = np.random.randn(size, hidden_size, 1)
+        self.w2 = np.random.randn(size, output_size, hidden_size)
+        self.b2 = np.random.randn(size, output_size, 1)
+
+    @classmethod
+    def from_networks(cls, networks):
+        # Stack existing brains (all of the same shape)
+        first = networks[0]
+        brain = cls(0, first.w1.shape[1], first.w1.shape[0], first.w2.shape[0])
+        brain.w1 = np.stack([n.w1 for n in networks])
+        brain.b1 = np.stack([n.b1 for n in networks])
+        brain.w2 = np.stack([n.w2 for n in networks])
+        brain.b2 = np.stack([n.b2 for n in networks])
+        return brain
+
+    def __len__(self):
+        return len(self.w1)
+
+    def select(self, cars):
+        # PopulationBrain of just these cars (a slice or indices)
+        brain = PopulationBrain(0, self.w1.shape[2], self.w1.shape[1], self.w2.shape[1])
+        brain.w1 = self.w1[cars]
+        brain.b1 = self.b1[cars]
+        brain.w2 = self.w2[cars]
+        brain.b2 = self.b2[cars]
+        return brain
+
+    def activate(self, x):
+        # Sigmoid activation
+        return 1 / (1 + np.exp(-x))
+
+    def forward(self, inputs, cars=None):
+        # inputs: one sensor vector per row. With cars (indices, e.g. of
+        # the cars still alive) row k belongs to car cars[k], otherwise to
+        # car k. Returns one row of outputs per input row.
+        inputs = np.asarray(inputs, dtype=float)[:, :, np.newaxis]  # column vectors
+        w1, b1, w2, b2 = self.w1, self.b1, self.w2, self.b2
+        if cars is not None:
+            w1, b1, w2, b2 = w1[cars], b1[cars], w2[cars], b2[cars]
+        a1 = self.activate(np.matmul(w1, inputs) + b1)
+        a2 = self.activate(np.matmul(w2, a1) + b2)
+        return a2[:, :, 0]
+
+    def mutate(self, rate=0.1, cars=None):
+        # Randomly adjust the weights of every car (or just `cars`)
+        cars = slice(None) if cars is None else cars
+        for mat in (self.w1, self.b1, self.w2, self.b2):
+            mat[cars] += np.random.randn(*mat[cars].shape) * rate
+
+    def network(self, i):
+        # Copy of car i's brain as a NeuralNetwork
+        return NeuralNetwork.from_weights(self.w1[i].copy(), self.b1[i].copy(),
+                                          self.w2[i].copy(), self.b2[i].copy())
+
+    def networks(self):
+        return [self.network(i) for i in range(len(self))]
+
+    def set_network(self, i, net):
+        self.w1[i] = net.w1
+        self.b1[i] = net.b1
+        self.w2[i] = net.w2
+        self.b2[i] = net.b2
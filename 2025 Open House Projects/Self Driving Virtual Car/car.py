@@ -4,7 +4,7 @@ import numpy as np
 from brain import NeuralNetwork
 
 class Car:
-    def __init__(self, x, y, brain=None):
+    def __init__(self, x, y, brain=None, own_brain=True):
         self.x = x
         self.y = y
         self.angle = 0
@@ -15,6 +15,7 @@ class Car:
         self.length = 20
         self.width = 10
         self.is_alive = True
+        self.previous = (x, y, 0)  # pose before the last physics step, for drawing
 
         # Sensors
         self.num_sensors = 5
@@ -22,16 +23,29 @@ class Car:
         self.sensors = []
         self.sensor_data = [1] * self.num_sensors
 
-        # AI Brain
-        self.brain = brain if brain else NeuralNetwork(self.num_sensors, 10, 2)
+        # AI Brain. own_brain=False leaves it None for cars that something
+        # else thinks for and moves with drive() (evolution's Race)
+        self.brain = brain
+        if brain is None and own_brain:
+            self.brain = NeuralNetwork(self.num_sensors, 10, 2)
 
-    def update(self, screen, track_mask):
+    def update(self, screen, track_mask, field=None):
+        # One physics step, then draw
+        self.step(track_mask, field)
+        self.draw(screen)
+
+    def step(self, track_mask, field=None):
+        # Sense, think and drive for one fixed timestep (simulation.DT)
         if not self.is_alive:
             return
 
-        self.cast_sensors(track_mask)
+        self.cast_sensors(track_mask, field)
         output = self.brain.forward(self.sensor_data)
+        self.drive(output, track_mask)
 
+    def drive(self, output, track_mask):
+        # Apply the brain's output (turn, accelerate) and move one step
+        self.previous = (self.x, self.y, self.angle)
         if output[0] > 0.5:
             self.angle -= self.rotation_speed
         if output[1] > 0.5:
@@ -46,23 +60,37 @@ class Car:
         if self.check_collision(track_mask):
             self.is_alive = False
 
-        self.draw(screen)
+    def draw(self, screen, alpha=1.0):
+        # alpha: how far the frame is between the previous physics step (0)
+        # and the last one (1). Crashed cars stay where they stopped.
+        x, y, angle = self.x, self.y, self.angle
+        if self.is_alive and alpha < 1:
+            px, py, pangle = self.previous
+            x = px + (x - px) * alpha
+            y = py + (y - py) * alpha
+            angle = pangle + (angle - pangle) * alpha
 
-    def draw(self, screen):
         # Draw car
         rect = pygame.Rect(0, 0, self.length, self.width)
-        rect.center = (self.x, self.y)
-        rotated_image = pygame.transform.rotate(pygame.Surface((self.length, self.width)), -self.angle)
+        rect.center = (x, y)
+        rotated_image = pygame.transform.rotate(pygame.Surface((self.length, self.width)), -angle)
         rotated_image.fill((0, 255, 0) if self.is_alive else (255, 0, 0))
-        rotated_rect = rotated_image.get_rect(center=(self.x, self.y))
+        rotated_rect = rotated_image.get_rect(center=(x, y))
         screen.blit(rotated_image, rotated_rect)
 
-        # Draw sensors
+        # Draw sensors, moved along with the car
+        dx, dy = x - self.x, y - self.y
         for sx, sy in self.sensors:
-            pygame.draw.line(screen, (255, 255, 0), (self.x, self.y), (sx, sy), 1)
-            pygame.draw.circle(screen, (255, 0, 0), (int(sx), int(sy)), 3)
+            pygame.draw.line(screen, (255, 255, 0), (x, y), (sx + dx, sy + dy), 1)
+            pygame.draw.circle(screen, (255, 0, 0), (int(sx + dx), int(sy + dy)), 3)
+
+    def cast_sensors(self, track_mask, field=None):
+        # With a sensors.SensorField the rays are marched over the track's
+        # distance field instead (same readings, far fewer lookups)
+        if field is not None:
+            field.read([self])
+            return
 
-    def cast_sensors(self, track_mask):
         self.sensors = []
         self.sensor_data = []
 
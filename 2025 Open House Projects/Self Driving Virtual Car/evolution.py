@@ -0,0 +1,244 @@
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+import pygame
+
+from brain import PopulationBrain
+from car import Car
+from main import WIDTH, HEIGHT, FPS, TRACK_IMAGE, START_POS
+
+# profiler and sharedpool live with the path finding projects
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Path Finding Vizualiser"))
+import profiler
+import sharedpool
+from sensors import SensorField
+from simulation import FixedStep
+from utils import load_track
+
+# Train the cars' brains with a genetic algorithm. Each generation drives
+# one car per brain from START_POS until every car has crashed or stalled,
+# or the step limit is up. The best brains go on unchanged (elitism) and
+# the rest of the next generation are mutated clones of brains picked from
+# the top ones. Fitness is progress along the track: the angle a car has
+# swept around the track's centre, in laps. Generations run headless as
+# fast as the CPU allows, split over --workers processes; every
+# --render-every'th one is shown in a window, --render-speed times real time.
+# Either way the cars take the same fixed physics steps, so the window does
+# not change the results. Run from this folder, e.g.
+#   python evolution.py --population 200 --generations 50 --render-every 10
+#   python evolution.py --population 1000 --generations 20 --workers 8
+
+POPULATION = 100
+GENERATIONS = 30
+MAX_STEPS = 2000  # physics steps per generation
+STALL_STEPS = 100  # cars that gain less than STALL_LAPS in this many steps are stopped
+STALL_LAPS = 0.01
+ELITE = 5  # best brains kept as they are
+PARENTS = 20  # best brains the rest are cloned from
+MUTATION_RATE = 0.1
+
+class Race:
+    # One car per brain, all driven together one physics step at a time.
+    # Sensors and brains run for all living cars at once.
+    def __init__(self, brain, field, track_mask, center, max_steps=MAX_STEPS):
+        self.brain = brain
+        self.field = field
+        self.track_mask = track_mask
+        self.max_steps = max_steps
+        # The cars have no brain of their own: step() runs the population's
+        # brain for all of them at once
+        self.cars = [Car(*START_POS, own_brain=False) for _ in range(len(brain))]
+        self.center = center
+        cx, cy = center
+        self.swept = np.zeros(len(self.cars))
+        self.heading = np.full(len(self.cars), math.atan2(START_POS[1] - cy, START_POS[0] - cx))
+        self.checkpoint = np.zeros(len(self.cars))
+        self.steps = 0
+        self.done = False
+
+    def step(self):
+        if self.done:
+            return
+        cars = self.cars
+        alive = np.array([i for i, car in enumerate(cars) if car.is_alive], dtype=np.int64)
+        if not len(alive) or self.steps >= self.max_steps:
+            self.done = True
+            return
+        self.steps += 1
+        living = [cars[i] for i in alive]
+        self.field.read(living)
+        outputs = self.brain.forward([car.sensor_data for car in living], alive)
+        for car, output in zip(living, outputs):
+            car.drive(output, self.track_mask)
+
+        # Angle each car turned through around the centre this step
+        cx, cy = self.center
+        angle = np.arctan2(np.array([car.y for car in living]) - cy,
+                           np.array([car.x for car in living]) - cx)
+        self.swept[alive] += (angle - self.heading[alive] + np.pi) % (2 * np.pi) - np.pi
+        self.heading[alive] = angle
+
+        if self.steps % STALL_STEPS == 0:
+            laps = self.fitness()
+            for i in alive[laps[alive] - self.checkpoint[alive] < STALL_LAPS]:
+                cars[i].is_alive = False
+            self.checkpoint = laps
+
+    def fitness(self):
+        # Each car's progress in laps
+        return np.abs(self.swept) / (2 * np.pi)
+
+
+def simulate(brain, field, track_mask, center, max_steps=MAX_STEPS, watch=None):
+    # Run a race to the end: headless as fast as it goes, or through
+    # watch(race) if given. Returns each car's progress in laps and the
+    # steps driven.
+    race = Race(brain, field, track_mask, center, max_steps)
+    if watch is not None:
+        watch(race)
+    while not race.done:
+        race.step()
+    return race.fitness(), race.steps
+
+
+def simulate_task(brain, max_steps, sensor_length, center):
+    # The pool's array is the field's steps; the field stands in for the
+    # track mask in the collision checks
+    steps = sharedpool.shared()
+    field = SensorField.from_buffer(steps, *steps.shape, sensor_length)
+    return simulate(brain, field, field, center, max_steps)
+
+
+class Evaluator:
+    # Runs simulate() for a whole generation, either here or split into
+    # one chunk of cars per worker process (bigger batches make each step
+    # cheaper, so chunks are not made any smaller). Cars never meet, so
+    # the split does not change any car's fitness. The workers read the
+    # field's steps from a sharedpool block: only brains (weight arrays)
+    # are sent out and fitness arrays back.
+    def __init__(self, field, track_mask, center, workers=1):
+        self.field = field
+        self.track_mask = track_mask
+        self.center = center
+        self.workers = workers
+        self.pool = None
+        if workers > 1:
+            self.pool = sharedpool.SharedPool(workers, field.steps.shape, field.steps.dtype, field.steps)
+
+    def evaluate(self, brain, max_steps=MAX_STEPS, watch=None):
+        # Generations that are watched run here, next to the window
+        if self.pool is None or watch is not None:
+            return simulate(brain, self.field, self.track_mask, self.center, max_steps, watch)
+        chunks = np.array_split(np.arange(len(brain)), min(len(brain), self.workers))
+        n = len(chunks)
+        results = list(self.pool.map(simulate_task, [brain.select(cars) for cars in chunks],
+                                     [max_steps] * n, [self.field.sensor_length] * n, [self.center] * n))
+        return np.concatenate([fitness for fitness, _ in results]), max(steps for _, steps in results)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+
+
+def next_generation(brain, fitness, elite=ELITE, parents=PARENTS, rate=MUTATION_RATE):
+    # Keep the best `elite` brains and fill up with mutated clones of
+    # brains picked at random from the best `parents`
+    order = np.argsort(-fitness, kind="stable")
+    networks = [brain.network(i) for i in order[:elite]]
+    top = [brain.network(i) for i in order[:max(parents, 1)]]
+    while len(networks) < len(brain):
+        child = top[np.random.randint(len(top))].clone()
+        child.mutate(rate)
+        networks.append(child)
+    return PopulationBrain.from_networks(networks)
+
+
+def make_watcher(screen, track, generation, speed=1):
+    def watch(race):
+        # Fixed physics steps for the time each frame takes (times speed),
+        # drawn in between the last two
+        clock = pygame.time.Clock()
+        physics = FixedStep(race.step, speed)
+        alpha = 1.0
+        while not race.done:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    pygame.quit()
+                    sys.exit()
+            with profiler.section("draw"):
+                screen.blit(track, (0, 0))
+                for car in race.cars:
+                    car.draw(screen, alpha)
+            pygame.display.flip()
+            pygame.display.set_caption(f"Self-Driving Virtual Car - generation {generation}, "
+                                       f"{sum(car.is_alive for car in race.cars)} cars alive")
+            alpha = physics.tick(clock, FPS)
+    return watch
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evolve the cars' brains with a genetic algorithm")
+    parser.add_argument("--population", type=int, default=POPULATION)
+    parser.add_argument("--generations", type=int, default=GENERATIONS)
+    parser.add_argument("--steps", type=int, default=MAX_STEPS, help="physics step limit per generation")
+    parser.add_argument("--elite", type=int, default=ELITE)
+    parser.add_argument("--parents", type=int, default=PARENTS)
+    parser.add_argument("--rate", type=float, default=MUTATION_RATE, help="mutation rate")
+    parser.add_argument("--render-every", type=int, default=0, metavar="N",
+                        help="show every Nth generation in a window (default: never)")
+    parser.add_argument("--render-speed", type=float, default=1, metavar="X",
+                        help="play shown generations at X times real time")
+    parser.add_argument("--workers", type=int, default=1, help="processes to evaluate generations on")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--profile", action="store_true", help="show frame timings of shown generations")
+    parser.add_argument("--trace", metavar="FILE", help="save frame timings as a Chrome trace")
+    args = parser.parse_args(argv)
+    with profiler.profiling(args.profile or args.trace, args.trace, args.profile):
+        train(args)
+
+
+def train(args):
+    np.random.seed(args.seed)
+    screen = None
+    if args.render_every:
+        pygame.init()
+        screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    track, track_mask = load_track(TRACK_IMAGE, WIDTH, HEIGHT)
+    # Sensor and brain sizes come from a default car
+    template = Car(*START_POS)
+    field = SensorField.from_mask(track_mask, template.sensor_length)
+    center = track_mask.centroid()
+    shape = template.brain.w1.shape[1], template.brain.w1.shape[0], template.brain.w2.shape[0]
+    brain = PopulationBrain(args.population, *shape)
+    evaluator = Evaluator(field, track_mask, center, args.workers)
+    try:
+        begin = time.perf_counter()
+        for generation in range(1, args.generations + 1):
+            watch = None
+            if screen is not None and generation % args.render_every == 0:
+                watch = make_watcher(screen, track, generation, args.render_speed)
+            elif screen is not None:
+                pygame.event.pump()
+
+            start = time.perf_counter()
+            fitness, steps = evaluator.evaluate(brain, args.steps, watch)
+            print(f"generation {generation:3}: best {fitness.max():.3f} laps, mean {fitness.mean():.3f}, "
+                  f"{steps} steps in {time.perf_counter() - start:.2f} s")
+            if generation < args.generations:
+                brain = next_generation(brain, fitness, args.elite, args.parents, args.rate)
+    finally:
+        evaluator.close()
+
+    minutes = (time.perf_counter() - begin) / 60
+    print(f"{args.generations} generations of {args.population} cars on {args.workers} "
+          f"worker{'s' if args.workers > 1 else ''} ({args.generations / minutes:.1f} generations/minute)")
+    if screen is not None:
+        pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
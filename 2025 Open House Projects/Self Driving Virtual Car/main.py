@@ -1,38 +1,66 @@
+import argparse
+import os
+import sys
+
 import pygame
 from car import Car
+from sensors import SensorField
+from simulation import FixedStep
+from utils import load_track
+
+# The frame profiler is shared with the apps in the Path Finding
+# Vizualiser folder. Run from this folder, e.g.
+#   python main.py --speed 4 --profile --trace car.json
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Path Finding Vizualiser"))
+import profiler
 
 # === Config ===
 WIDTH, HEIGHT = 800, 600
-FPS = 60
-TRACK_IMAGE = "track.png"  # Black = walls, White = road
+FPS = 60  # frames drawn per second; physics runs at simulation.STEP_HZ
+TRACK_IMAGE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "track.png")  # Black = walls, White = road
 START_POS = (100, 300)
 
-# === Init ===
-pygame.init()
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Self-Driving Virtual Car")
-clock = pygame.time.Clock()
 
-# === Load Track ===
-track = pygame.image.load(TRACK_IMAGE).convert()
-track = pygame.transform.scale(track, (WIDTH, HEIGHT))
-track_mask = pygame.mask.from_surface(track)
+def main(width=WIDTH, height=HEIGHT, track_image=TRACK_IMAGE, speed=1):
+    # === Init ===
+    pygame.init()
+    screen = pygame.display.set_mode((width, height))
+    pygame.display.set_caption("Self-Driving Virtual Car")
+    clock = pygame.time.Clock()
+
+    # === Load Track ===
+    track, track_mask = load_track(track_image, width, height)
+
+    # === Create Car ===
+    car = Car(*START_POS)
+    field = SensorField.from_mask(track_mask, car.sensor_length)
+    # Physics steps for the time each frame took (times speed), drawn in
+    # between the last two
+    physics = FixedStep(lambda: car.step(track_mask, field), speed)
+
+    # === Main Loop ===
+    running = True
+    alpha = 1.0
+    while running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
 
-# === Create Car ===
-car = Car(*START_POS)
+        with profiler.section("draw"):
+            screen.blit(track, (0, 0))
+            car.draw(screen, alpha)
 
-# === Main Loop ===
-running = True
-while running:
-    screen.blit(track, (0, 0))
+        pygame.display.flip()
+        alpha = physics.tick(clock, FPS)
 
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
+    pygame.quit()
 
-    car.update(screen, track_mask)
-    
-    pygame.display.flip()
-    clock.tick(FPS)
 
-pygame.quit()
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Drive a car around the track")
+    parser.add_argument("--speed", type=float, default=1, help="physics steps per frame at FPS")
+    parser.add_argument("--profile", action="store_true", help="show frame timings on screen")
+    parser.add_argument("--trace", metavar="FILE", help="save frame timings as a Chrome trace")
+    args = parser.parse_args()
+    with profiler.profiling(args.profile or args.trace, args.trace, args.profile):
+        main(speed=args.speed)
@@ -0,0 +1,130 @@
+import math
+
+import numpy as np
+import pygame
+
+# Sensor readings for many cars at once. The track's distance field is
+# computed once at load: for every pixel, how far the nearest wall is.
+# Rays are then marched with sphere tracing: from a sample whose pixel is D
+# away from any wall, the next D - sqrt(2) steps cannot hit one (the pixel
+# of a sample is its position rounded toward zero, which moves it less than
+# sqrt(2)), so they are skipped. All rays of all cars march together in
+# NumPy and stop at exactly the step Car.cast_sensors' pixel-by-pixel loop
+# would, so the readings are the same.
+
+SQRT2 = math.sqrt(2)
+
+
+def obstacles_from_mask(track_mask):
+    # (width, height) bool array of the mask's set bits (the walls)
+    surface = track_mask.to_surface(setcolor=(255, 255, 255, 255), unsetcolor=(0, 0, 0, 255))
+    return pygame.surfarray.array_red(surface) > 0
+
+
+def distance_field(obstacles, cap):
+    # Euclidean distance from every pixel to the nearest obstacle pixel,
+    # capped at cap. Pixels outside the array count as obstacles.
+    width, height = obstacles.shape
+    padded = np.ones((width + 2, height + 2), dtype=bool)
+    padded[1:-1, 1:-1] = obstacles
+
+    # Distance along each column to the nearest obstacle above or below
+    # (the border rows guarantee there is one)
+    ys = np.arange(height + 2)
+    above = np.maximum.accumulate(np.where(padded, ys, -1), axis=1)
+    below = np.minimum.accumulate(np.where(padded, ys, height + 2)[:, ::-1], axis=1)[:, ::-1]
+    column = np.minimum(np.minimum(ys - above, below - ys), cap + 1).astype(np.int32)
+
+    # Then the best column distance k pixels to either side, for every k
+    # that can still beat the cap
+    column2 = column * column
+    dist2 = column2.copy()
+    for k in range(1, min(cap, width + 2)):
+        np.minimum(dist2[k:], column2[:-k] + k * k, out=dist2[k:])
+        np.minimum(dist2[:-k], column2[k:] + k * k, out=dist2[:-k])
+    return np.sqrt(np.minimum(dist2, cap * cap))[1:-1, 1:-1]
+
+
+class SensorField:
+    def __init__(self, obstacles, sensor_length=100):
+        self.width, self.height = obstacles.shape
+        self.sensor_length = sensor_length
+        self.distance = distance_field(obstacles, sensor_length)
+        # Steps a ray can safely skip from each pixel (0 on walls): samples
+        # up to D - sqrt(2) further on land on pixels closer than D (less
+        # a hair, so rounding can never make a step too long)
+        steps = np.floor(self.distance - SQRT2 - 1e-9) + 1
+        self.steps = np.where(self.distance == 0, 0, np.maximum(steps, 1)).astype(np.int32)
+
+    @classmethod
+    def from_mask(cls, track_mask, sensor_length=100):
+        return cls(obstacles_from_mask(track_mask), sensor_length)
+
+    @classmethod
+    def from_buffer(cls, data, width, height, sensor_length=100):
+        # Wrap steps computed elsewhere (e.g. in shared memory) without
+        # copying; distance is not kept
+        field = cls.__new__(cls)
+        field.width = width
+        field.height = height
+        field.sensor_length = sensor_length
+        field.distance = None
+        field.steps = np.ndarray((width, height), dtype=np.int32, buffer=data)
+        return field
+
+    def get_at(self, pos):
+        # Same answer as the track mask's get_at (1 on walls, IndexError
+        # off the track), so a field can stand in for the mask
+        x, y = pos
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            raise IndexError("pixel off the track")
+        return 1 if self.steps[x, y] == 0 else 0
+
+    def cast(self, x, y, angles):
+        # x, y: car positions (n,); angles: ray angles in degrees (n, k).
+        # Returns the step each ray stopped at (n, k), like dist in
+        # Car.cast_sensors, and the pixel it stopped on (n, k, 2).
+        angles = np.asarray(angles, dtype=float)
+        x = np.broadcast_to(np.asarray(x, dtype=float)[:, np.newaxis], angles.shape).ravel()
+        y = np.broadcast_to(np.asarray(y, dtype=float)[:, np.newaxis], angles.shape).ravel()
+        # math.cos/sin rather than NumPy's, whose SIMD versions may differ
+        # in the last bit; cars share most angles, so this is cheap
+        radians, inverse = np.unique(np.radians(angles.ravel()), return_inverse=True)
+        cos = np.array([math.cos(a) for a in radians.tolist()])[inverse]
+        sin = np.array([math.sin(a) for a in radians.tolist()])[inverse]
+
+        last = self.sensor_length - 1
+        dist = np.zeros(len(x), dtype=np.int64)
+        rays = np.arange(len(x))
+        while len(rays):
+            d = dist[rays]
+            sx = (x[rays] + cos[rays] * d).astype(np.int64)
+            sy = (y[rays] + sin[rays] * d).astype(np.int64)
+            inside = (sx >= 0) & (sx < self.width) & (sy >= 0) & (sy < self.height)
+            step = np.zeros(len(rays), dtype=np.int64)
+            step[inside] = self.steps[sx[inside], sy[inside]]
+            # Rays on a wall or off the track stop here; the others jump
+            # ahead, and stop at the last step if that takes them past it
+            moving = step > 0
+            d = d + step
+            dist[rays[moving]] = np.minimum(d[moving], last)
+            rays = rays[moving & (d <= last)]
+
+        ends = np.stack([(x + cos * dist).astype(np.int64), (y + sin * dist).astype(np.int64)], axis=1)
+        shape = angles.shape
+        return dist.reshape(shape), ends.reshape(shape + (2,))
+
+    def read(self, cars):
+        # Fill in sensors and sensor_data of every car, as cast_sensors
+        # would (all cars are assumed to have the same sensors)
+        if not cars:
+            return
+        first = cars[0]
+        offsets = (np.arange(first.num_sensors) - first.num_sensors // 2) * 30
+        angles = np.array([car.angle for car in cars], dtype=float)[:, np.newaxis] + offsets
+        dist, ends = self.cast([car.x for car in cars], [car.y for car in cars], angles)
+        readings = (dist / first.sensor_length).tolist()
+        ends = ends.tolist()
+        for car, data, end in zip(cars, readings, ends):
+            car.sensors = [tuple(point) for point in end]
+            car.sensor_data = data
@@ -0,0 +1,40 @@
+# Fixed-timestep stepping for the car simulation. Physics always advances in
+# whole steps of DT (a car's speed and turn rate are per step), however long
+# frames take, so a run gives the same cars on any machine and at any frame
+# rate; only how many steps fit into each frame changes. Windows draw
+# between the last two steps (alpha, see Car.draw), headless runs just call
+# step() as fast as they can.
+
+STEP_HZ = 60  # physics steps per simulated second
+DT = 1 / STEP_HZ
+MAX_STEPS_PER_FRAME = 20  # beyond this a slow frame is dropped rather than caught up on
+
+
+class FixedStep:
+    # Runs step() once per DT of elapsed time, times speed (speed 4 runs
+    # four physics steps per 60 FPS frame)
+    def __init__(self, step, speed=1, max_steps=MAX_STEPS_PER_FRAME):
+        self.step = step
+        self.speed = speed
+        self.max_steps = max_steps
+        self.accumulator = 0.0
+        self.steps = 0
+
+    def advance(self, elapsed):
+        # elapsed: seconds since the last frame. Returns how far the time
+        # left over is into the next step (0..1), for drawing.
+        self.accumulator += elapsed * self.speed
+        taken = 0
+        while self.accumulator >= DT and taken < self.max_steps * self.speed:
+            self.step()
+            self.accumulator -= DT
+            taken += 1
+        self.steps += taken
+        if self.accumulator >= DT:
+            # Too far behind (window dragged, debugger): start afresh
+            self.accumulator = 0.0
+        return self.accumulator / DT
+
+    def tick(self, clock, framerate):
+        # Cap the frame rate with clock and step for the time it took
+        return self.advance(clock.tick(framerate) / 1000)
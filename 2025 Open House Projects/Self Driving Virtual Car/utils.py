@@ -0,0 +1,16 @@
+import pygame
+
+# Pixels this close to black count as walls (track.png is black lines on white)
+WALL_COLOR = (0, 0, 0)
+WALL_THRESHOLD = (128, 128, 128, 255)
+
+
+def load_track(path, width, height):
+    # Track image scaled to the window, and a mask with the walls set.
+    # mask.from_surface would set every pixel of an opaque image.
+    track = pygame.image.load(path)
+    if pygame.display.get_surface() is not None:
+        track = track.convert()
+    track = pygame.transform.scale(track, (width, height))
+    track_mask = pygame.mask.from_threshold(track, WALL_COLOR, WALL_THRESHOLD)
+    return track, track_mask